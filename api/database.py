@@ -1,30 +1,164 @@
 """Database connection management"""
 import os
+import queue
 import sqlite3
+import threading
 from pathlib import Path
 from contextlib import contextmanager
+from typing import Optional
 
 
-def get_db_path() -> Path:
-    """Get database file path from environment"""
-    db_file = os.environ.get("DB_FILE", "/data/datalake.db")
-    return Path(db_file)
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "4"))
 
+# Seconds a request waits for a free pooled connection before giving up
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "5"))
 
-@contextmanager
-def get_db():
-    """Get database connection with WAL mode enabled"""
-    db_path = get_db_path()
-    conn = sqlite3.connect(db_path, check_same_thread=False)
+# Prepared statements kept per connection, keyed by SQL text. Every endpoint
+# builds its SQL from a small fixed set of shapes with values bound as
+# parameters, so after warm-up no request re-parses or re-plans.
+STATEMENT_CACHE_SIZE = 256
+
+
+# Resolved once at import; restart the server to point it at another file
+DB_PATH = Path(os.environ.get("DB_FILE", "/data/datalake.db"))
+
+
+# Applied once per pooled connection, never per request
+CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA synchronous=NORMAL",  # Safe with WAL; skips fsync on every commit
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",  # 256 MiB
+    "PRAGMA cache_size=-65536",  # 64 MiB
+    "PRAGMA busy_timeout=5000",
+)
+
+# journal_mode=WAL is stored in the database file, so it only needs setting
+# by the first connection that opens it
+_wal_enabled = False
+
+
+def connect(db_path: Path, readonly: bool = False) -> sqlite3.Connection:
+    """Open a connection with WAL mode and production PRAGMAs applied.
+
+    Read-only connections are opened with mode=ro, so they never take a
+    write lock and can't change the file even by accident.
+    """
+    global _wal_enabled
+    if readonly:
+        conn = sqlite3.connect(
+            f"{db_path.resolve().as_uri()}?mode=ro", uri=True,
+            check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE
+        )
+    else:
+        conn = sqlite3.connect(
+            db_path, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE
+        )
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
+    if not _wal_enabled and not readonly:
+        mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        _wal_enabled = mode == "wal"
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class PoolTimeout(Exception):
+    """No pooled connection became free within POOL_TIMEOUT"""
+
+
+class ConnectionPool:
+    """Bounded pool of long-lived connections.
+
+    Reusing connections keeps SQLite's per-connection page cache and
+    statement cache warm and runs the PRAGMA setup once per connection
+    instead of once per request.
+    """
+
+    def __init__(self, db_path: Path, size: int = POOL_SIZE, readonly: bool = False):
+        self._connections: queue.Queue = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._connections.put(connect(db_path, readonly))
+
+    def acquire(self, timeout: float = POOL_TIMEOUT) -> sqlite3.Connection:
+        """Take a connection, waiting up to timeout seconds for one to free up.
+
+        Bounded so a pool held by slow clients turns into errors rather than
+        every threadpool worker blocking here.
+        """
+        try:
+            return self._connections.get(timeout=timeout)
+        except queue.Empty:
+            raise PoolTimeout(f"No database connection free after {timeout}s") from None
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Return a connection to the pool"""
+        if conn.in_transaction:
+            conn.rollback()
+        self._connections.put(conn)
+
+    def close(self) -> None:
+        """Close every idle connection"""
+        while True:
+            try:
+                conn = self._connections.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+
+
+# Every GET endpoint reads through _readers; the single writer connection
+# serializes writes the same way SQLite would anyway
+_readers: Optional[ConnectionPool] = None
+_writer: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def init_pool(size: int = POOL_SIZE) -> ConnectionPool:
+    """Create the shared reader and writer pools if they don't exist yet"""
+    global _readers, _writer
+    with _pool_lock:
+        if _writer is None:
+            # Opened first so it can switch the file to WAL for the readers
+            _writer = ConnectionPool(DB_PATH, 1)
+        if _readers is None:
+            _readers = ConnectionPool(DB_PATH, size, readonly=True)
+        return _readers
+
+
+def close_pool() -> None:
+    """Close the shared connection pools"""
+    global _readers, _writer
+    with _pool_lock:
+        for pool in (_readers, _writer):
+            if pool is not None:
+                pool.close()
+        _readers = _writer = None
+
+
+@contextmanager
+def get_db(readonly: bool = True):
+    """Borrow a pooled database connection.
+
+    Readers get a mode=ro connection; pass readonly=False to borrow the
+    writer.
+    """
+    if _readers is None or _writer is None:
+        init_pool()
+    pool = _readers if readonly else _writer
+    conn = pool.acquire()
     try:
         yield conn
     finally:
-        conn.close()
+        pool.release(conn)
 
 
 def dict_from_row(row: sqlite3.Row) -> dict:
     """Convert sqlite3.Row to dictionary"""
     return {key: row[key] for key in row.keys()}
+
+
+def dicts_from_cursor(cursor: sqlite3.Cursor) -> list[dict]:
+    """Fetch all remaining rows as dictionaries, reading column names once"""
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
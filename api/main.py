@@ -1,15 +1,40 @@
 """Datalake REST API - Minimal server for network access"""
-from fastapi import FastAPI, HTTPException
+import logging
+import sqlite3
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
-from .database import get_db, dict_from_row
+from .database import (
+    PoolTimeout, get_db, init_pool, close_pool, dict_from_row, dicts_from_cursor
+)
+from .memory_router import router as memory_router
+from .responses import ORJSONResponse, cached_json
+
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the connection pool on startup and close it on shutdown"""
+    try:
+        init_pool()
+    except sqlite3.Error:
+        pass  # get_db() retries on first use; /health reports the failure
+    yield
+    close_pool()
+
 
 app = FastAPI(
     title="Datalake API",
     description="REST API for audio, transcripts, and screenshots",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Enable CORS for desktop access
@@ -22,6 +47,109 @@ app.add_middleware(
 )
 
 
+@app.exception_handler(sqlite3.Error)
+async def sqlite_error_handler(request: Request, exc: sqlite3.Error):
+    """Report database errors from any handler as a 500.
+
+    The SQLite message can name tables, columns and constraints, so it only
+    goes to the log. This handler runs inside ExceptionMiddleware, where
+    nothing else would log the error.
+    """
+    logger.exception("Database error on %s %s", request.method, request.url.path, exc_info=exc)
+    return ORJSONResponse(status_code=500, content={"detail": "Database error"})
+
+
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    """Every pooled connection is busy; tell the client to retry"""
+    return ORJSONResponse(
+        status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"}
+    )
+
+
+@app.exception_handler(Exception)
+async def unhandled_error_handler(request: Request, exc: Exception):
+    """Catch-all 500 that doesn't leak internals; the traceback is still logged.
+
+    Starlette runs this handler outside CORSMiddleware, so the CORS headers
+    that policy would add (any origin, with credentials) are set here, or the
+    browser would see an opaque network error instead of the 500.
+    """
+    response = ORJSONResponse(status_code=500, content={"detail": "Internal server error"})
+    origin = request.headers.get("origin")
+    if origin:
+        response.headers["Access-Control-Allow-Origin"] = origin
+        response.headers["Access-Control-Allow-Credentials"] = "true"
+        response.headers["Vary"] = "Origin"
+    return response
+
+
+# Handlers that touch SQLite or the filesystem are plain `def`: FastAPI runs
+# them in its threadpool, so blocking queries don't stall the event loop.
+
+
+def build_list_query(table: str, tag_table: str, id_column: str,
+                     tags: Optional[str],
+                     after_created_at: Optional[str] = None,
+                     after_id: Optional[int] = None) -> tuple[str, list]:
+    """Build a newest-first listing query, filtering by normalized tags.
+
+    Comma-separated tags must all match. The first tag drives an index range
+    scan on (tag, created_at); the rest are primary-key lookups. When the
+    created_at and id of the last row seen are given, the query seeks past
+    them on the (created_at, id) index instead of re-scanning with OFFSET.
+    """
+    tag_list = [tag.strip() for tag in tags.split(",") if tag.strip()] if tags else []
+
+    if tag_list:
+        query = f"SELECT r.* FROM {tag_table} t JOIN {table} r ON r.id = t.{id_column}"
+        created_col, id_col = "t.created_at", f"t.{id_column}"
+        conditions = ["t.tag = ?"]
+        conditions += [
+            f"EXISTS (SELECT 1 FROM {tag_table} WHERE {id_column} = r.id AND tag = ?)"
+        ] * (len(tag_list) - 1)
+        params = list(tag_list)
+    else:
+        query = f"SELECT * FROM {table}"
+        created_col, id_col = "created_at", "id"
+        conditions, params = [], []
+
+    if after_created_at is not None and after_id is not None:
+        conditions.append(f"({created_col}, {id_col}) < (?, ?)")
+        params.extend([after_created_at, after_id])
+
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {created_col} DESC, {id_col} DESC"
+    return query, params
+
+
+def list_resource(table: str, tag_table: str, id_column: str,
+                  tags: Optional[str], after_created_at: Optional[str],
+                  after_id: Optional[int], limit: int, offset: int) -> ORJSONResponse:
+    """Shared body of the audio/transcript/screenshot listing endpoints"""
+    query, params = build_list_query(
+        table, tag_table, id_column, tags, after_created_at, after_id
+    )
+    query += " LIMIT ? OFFSET ?"
+    params.extend([limit, offset])
+
+    with get_db() as conn:
+        cursor = conn.execute(query, params)
+        return ORJSONResponse(dicts_from_cursor(cursor))
+
+
+def get_resource(table: str, row_id: int, not_found: str) -> Dict[str, Any]:
+    """Shared body of the get-by-id endpoints; 404s with not_found"""
+    with get_db() as conn:
+        row = conn.execute(f"SELECT * FROM {table} WHERE id = ?", (row_id,)).fetchone()
+
+    if not row:
+        raise HTTPException(status_code=404, detail=not_found)
+
+    return dict_from_row(row)
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -39,7 +167,7 @@ async def root():
 
 
 @app.get("/health")
-async def health_check():
+def health_check():
     """Health check endpoint"""
     try:
         with get_db() as conn:
@@ -51,347 +179,152 @@ async def health_check():
 
 
 @app.get("/api/v1/audio")
-async def list_audio(
+def list_audio(
     limit: int = 10,
     offset: int = 0,
-    tags: Optional[str] = None
+    tags: Optional[str] = None,
+    after_created_at: Optional[str] = None,
+    after_id: Optional[int] = None
 ) -> List[Dict[str, Any]]:
-    """List audio files with optional filtering"""
-    try:
-        with get_db() as conn:
-            query = "SELECT * FROM audio"
-            params = []
+    """List audio files with optional filtering.
 
-            if tags:
-                query += " WHERE tags LIKE ?"
-                params.append(f"%{tags}%")
-
-            query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
-            params.extend([limit, offset])
-
-            cursor = conn.execute(query, params)
-            rows = cursor.fetchall()
-
-            return [dict_from_row(row) for row in rows]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    For deep pagination pass the created_at and id of the last row from the
+    previous page as after_created_at/after_id instead of a growing offset.
+    """
+    return list_resource(
+        "audio", "audio_tags", "audio_id",
+        tags, after_created_at, after_id, limit, offset
+    )
 
 
 @app.get("/api/v1/audio/{audio_id}")
-async def get_audio(audio_id: int) -> Dict[str, Any]:
+def get_audio(audio_id: int) -> Dict[str, Any]:
     """Get audio file by ID"""
-    try:
-        with get_db() as conn:
-            cursor = conn.execute("SELECT * FROM audio WHERE id = ?", (audio_id,))
-            row = cursor.fetchone()
-
-            if not row:
-                raise HTTPException(status_code=404, detail="Audio file not found")
-
-            return dict_from_row(row)
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return get_resource("audio", audio_id, "Audio file not found")
 
 
 @app.get("/api/v1/transcripts")
-async def list_transcripts(
+def list_transcripts(
     limit: int = 10,
     offset: int = 0,
-    tags: Optional[str] = None
+    tags: Optional[str] = None,
+    after_created_at: Optional[str] = None,
+    after_id: Optional[int] = None
 ) -> List[Dict[str, Any]]:
-    """List transcripts with optional filtering"""
-    try:
-        with get_db() as conn:
-            query = "SELECT * FROM transcripts"
-            params = []
+    """List transcripts with optional filtering.
 
-            if tags:
-                query += " WHERE tags LIKE ?"
-                params.append(f"%{tags}%")
-
-            query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
-            params.extend([limit, offset])
-
-            cursor = conn.execute(query, params)
-            rows = cursor.fetchall()
-
-            return [dict_from_row(row) for row in rows]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    For deep pagination pass the created_at and id of the last row from the
+    previous page as after_created_at/after_id instead of a growing offset.
+    """
+    return list_resource(
+        "transcripts", "transcript_tags", "transcript_id",
+        tags, after_created_at, after_id, limit, offset
+    )
 
 
 @app.get("/api/v1/transcripts/{transcript_id}")
-async def get_transcript(transcript_id: int) -> Dict[str, Any]:
+def get_transcript(transcript_id: int) -> Dict[str, Any]:
     """Get transcript by ID"""
-    try:
-        with get_db() as conn:
-            cursor = conn.execute("SELECT * FROM transcripts WHERE id = ?", (transcript_id,))
-            row = cursor.fetchone()
-
-            if not row:
-                raise HTTPException(status_code=404, detail="Transcript not found")
-
-            return dict_from_row(row)
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return get_resource("transcripts", transcript_id, "Transcript not found")
 
 
 @app.get("/api/v1/screenshots")
-async def list_screenshots(
+def list_screenshots(
     limit: int = 10,
     offset: int = 0,
-    tags: Optional[str] = None
+    tags: Optional[str] = None,
+    after_created_at: Optional[str] = None,
+    after_id: Optional[int] = None
 ) -> List[Dict[str, Any]]:
-    """List screenshots with optional filtering"""
-    try:
-        with get_db() as conn:
-            query = "SELECT * FROM screenshots"
-            params = []
+    """List screenshots with optional filtering.
 
-            if tags:
-                query += " WHERE tags LIKE ?"
-                params.append(f"%{tags}%")
-
-            query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
-            params.extend([limit, offset])
-
-            cursor = conn.execute(query, params)
-            rows = cursor.fetchall()
-
-            return [dict_from_row(row) for row in rows]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    For deep pagination pass the created_at and id of the last row from the
+    previous page as after_created_at/after_id instead of a growing offset.
+    """
+    return list_resource(
+        "screenshots", "screenshot_tags", "screenshot_id",
+        tags, after_created_at, after_id, limit, offset
+    )
 
 
 @app.get("/api/v1/screenshots/{screenshot_id}")
-async def get_screenshot(screenshot_id: int) -> Dict[str, Any]:
+def get_screenshot(screenshot_id: int) -> Dict[str, Any]:
     """Get screenshot by ID"""
-    try:
-        with get_db() as conn:
-            cursor = conn.execute("SELECT * FROM screenshots WHERE id = ?", (screenshot_id,))
-            row = cursor.fetchone()
-
-            if not row:
-                raise HTTPException(status_code=404, detail="Screenshot not found")
-
-            return dict_from_row(row)
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return get_resource("screenshots", screenshot_id, "Screenshot not found")
 
 
 @app.get("/api/v1/search/transcripts")
-async def search_transcripts(q: str, limit: int = 10) -> List[Dict[str, Any]]:
+def search_transcripts(q: str, limit: int = 10) -> List[Dict[str, Any]]:
     """Full-text search on transcripts using FTS5"""
     if not q:
         raise HTTPException(status_code=400, detail="Search query 'q' is required")
 
-    try:
-        with get_db() as conn:
-            query = """
+    with get_db() as conn:
+        # Rank and limit inside the CTE so the planner keeps the FTS5
+        # index, then join only the top hits back to transcripts
+        query = """
+            WITH fts AS (
                 SELECT
-                    t.*,
+                    rowid,
+                    rank as score,
                     snippet(transcripts_fts, 0, '>>>', '<<<', '...', 40) as snippet
-                FROM transcripts t
-                JOIN transcripts_fts ON t.id = transcripts_fts.rowid
+                FROM transcripts_fts
                 WHERE transcripts_fts MATCH ?
                 ORDER BY rank
                 LIMIT ?
-            """
-            cursor = conn.execute(query, (q, limit))
-            rows = cursor.fetchall()
-
-            return [dict_from_row(row) for row in rows]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+            )
+            SELECT t.*, fts.snippet
+            FROM fts
+            JOIN transcripts t ON t.id = fts.rowid
+            ORDER BY fts.score
+        """
+        cursor = conn.execute(query, (q, limit))
+        return dicts_from_cursor(cursor)
 
 
 @app.get("/api/v1/stats")
-async def get_stats() -> Dict[str, Any]:
+@cached_json(ttl=2)
+def get_stats() -> Dict[str, Any]:
     """Get database statistics"""
-    try:
-        with get_db() as conn:
-            # Audio stats
-            cursor = conn.execute("""
-                SELECT
-                    COUNT(*) as total_files,
-                    COALESCE(SUM(duration_seconds), 0) as total_duration,
-                    COALESCE(SUM(size_bytes), 0) as total_size
-                FROM audio
-            """)
-            audio_stats = dict_from_row(cursor.fetchone())
-
-            # Transcript stats
-            cursor = conn.execute("""
-                SELECT
-                    COUNT(*) as total_files,
-                    COALESCE(SUM(word_count), 0) as total_words,
-                    COALESCE(SUM(size_bytes), 0) as total_size
-                FROM transcripts
-            """)
-            transcript_stats = dict_from_row(cursor.fetchone())
-
-            # Screenshot stats
-            cursor = conn.execute("""
-                SELECT
-                    COUNT(*) as total_files,
-                    COALESCE(SUM(size_bytes), 0) as total_size
-                FROM screenshots
-            """)
-            screenshot_stats = dict_from_row(cursor.fetchone())
-
-            return {
-                "audio": audio_stats,
-                "transcripts": transcript_stats,
-                "screenshots": screenshot_stats
+    with get_db() as conn:
+        # One statement for all three tables; the middle column is
+        # duration for audio, word count for transcripts, unused otherwise
+        rows = conn.execute("""
+            SELECT 'audio', COUNT(*),
+                   COALESCE(SUM(duration_seconds), 0),
+                   COALESCE(SUM(size_bytes), 0)
+            FROM audio
+            UNION ALL
+            SELECT 'transcripts', COUNT(*),
+                   COALESCE(SUM(word_count), 0),
+                   COALESCE(SUM(size_bytes), 0)
+            FROM transcripts
+            UNION ALL
+            SELECT 'screenshots', COUNT(*), NULL,
+                   COALESCE(SUM(size_bytes), 0)
+            FROM screenshots
+        """).fetchall()
+        stats = {row[0]: row for row in rows}
+
+        audio, transcripts, screenshots = (
+            stats["audio"], stats["transcripts"], stats["screenshots"]
+        )
+        return {
+            "audio": {
+                "total_files": audio[1],
+                "total_duration": audio[2],
+                "total_size": audio[3]
+            },
+            "transcripts": {
+                "total_files": transcripts[1],
+                "total_words": transcripts[2],
+                "total_size": transcripts[3]
+            },
+            "screenshots": {
+                "total_files": screenshots[1],
+                "total_size": screenshots[3]
             }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-# =============================================================================
-# Memory Monitoring Endpoints
-# =============================================================================
-
-@app.get("/api/v1/memory/metrics/today")
-async def get_memory_metrics_today() -> List[Dict[str, Any]]:
-    """Get today's memory metrics for charting"""
-    try:
-        with get_db() as conn:
-            cursor = conn.execute("""
-                SELECT pid, session_id, rss_mb, memory_rate_mb_min,
-                       timestamp, timestamp_unix
-                FROM memory_metrics
-                WHERE date(timestamp) = date('now', 'localtime')
-                ORDER BY timestamp_unix ASC
-            """)
-            rows = cursor.fetchall()
-            return [dict_from_row(row) for row in rows]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@app.get("/api/v1/memory/metrics/range")
-async def get_memory_metrics_range(
-    start: str,
-    end: str,
-    limit: int = 10000
-) -> List[Dict[str, Any]]:
-    """Get memory metrics for a date range"""
-    try:
-        with get_db() as conn:
-            cursor = conn.execute("""
-                SELECT pid, session_id, rss_mb, memory_rate_mb_min,
-                       timestamp, timestamp_unix
-                FROM memory_metrics
-                WHERE date(timestamp) >= ? AND date(timestamp) <= ?
-                ORDER BY timestamp_unix ASC
-                LIMIT ?
-            """, (start, end, limit))
-            rows = cursor.fetchall()
-            return [dict_from_row(row) for row in rows]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@app.get("/api/v1/memory/events/today")
-async def get_memory_events_today() -> List[Dict[str, Any]]:
-    """Get today's memory events"""
-    try:
-        with get_db() as conn:
-            cursor = conn.execute("""
-                SELECT event_type, pid, session_id, severity,
-                       message, details, timestamp, timestamp_unix
-                FROM memory_events
-                WHERE date(timestamp) = date('now', 'localtime')
-                ORDER BY timestamp_unix DESC
-            """)
-            rows = cursor.fetchall()
-            return [dict_from_row(row) for row in rows]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@app.get("/api/v1/memory/events/range")
-async def get_memory_events_range(
-    start: str,
-    end: str,
-    event_type: Optional[str] = None,
-    limit: int = 1000
-) -> List[Dict[str, Any]]:
-    """Get memory events for a date range"""
-    try:
-        with get_db() as conn:
-            query = """
-                SELECT event_type, pid, session_id, severity,
-                       message, details, timestamp, timestamp_unix
-                FROM memory_events
-                WHERE date(timestamp) >= ? AND date(timestamp) <= ?
-            """
-            params = [start, end]
-
-            if event_type:
-                query += " AND event_type = ?"
-                params.append(event_type)
-
-            query += " ORDER BY timestamp_unix DESC LIMIT ?"
-            params.append(limit)
-
-            cursor = conn.execute(query, params)
-            rows = cursor.fetchall()
-            return [dict_from_row(row) for row in rows]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@app.get("/api/v1/memory/sessions")
-async def get_memory_sessions() -> List[Dict[str, Any]]:
-    """Get list of Claude sessions with current memory info"""
-    try:
-        with get_db() as conn:
-            # Get latest metrics for each PID (active sessions)
-            cursor = conn.execute("""
-                SELECT m.pid, m.session_id, m.rss_mb, m.memory_rate_mb_min as rate,
-                       m.command, m.timestamp, m.source_device
-                FROM memory_metrics m
-                INNER JOIN (
-                    SELECT pid, MAX(timestamp_unix) as max_ts
-                    FROM memory_metrics
-                    WHERE timestamp_unix > (strftime('%s', 'now') - 3600)
-                    GROUP BY pid
-                ) latest ON m.pid = latest.pid AND m.timestamp_unix = latest.max_ts
-                ORDER BY m.rss_mb DESC
-            """)
-            rows = cursor.fetchall()
-            return [dict_from_row(row) for row in rows]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@app.post("/api/v1/memory/sessions/{pid}/low-memory-mode")
-async def toggle_low_memory_mode(pid: int, enabled: bool = True) -> Dict[str, Any]:
-    """Toggle low-memory mode for a specific Claude session"""
-    import os
-    from pathlib import Path
-
-    try:
-        # Write to control file that hooks can read
-        control_dir = Path("/var/log/claude-memory/low-memory-mode")
-        control_dir.mkdir(parents=True, exist_ok=True)
-
-        control_file = control_dir / str(pid)
+        }
 
-        if enabled:
-            control_file.write_text("1")
-        else:
-            if control_file.exists():
-                control_file.unlink()
 
-        return {"success": True, "pid": pid, "low_memory_mode": enabled}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+app.include_router(memory_router)
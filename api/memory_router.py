@@ -0,0 +1,189 @@
+"""Memory monitoring endpoints, mounted under /api/v1/memory"""
+import os
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Iterator, List, Dict, Any, Optional
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from .database import DB_PATH, connect, get_db, dicts_from_cursor
+from .responses import ORJSONResponse, cached_json, iter_json_array
+
+
+router = APIRouter(
+    prefix="/api/v1/memory",
+    tags=["memory"],
+    default_response_class=ORJSONResponse,
+)
+
+
+def local_day_bounds(start: date, end: date) -> tuple[int, int]:
+    """Unix timestamps for local midnight on start and the day after end.
+
+    Filtering on timestamp_unix >= start AND < end stays on the index,
+    unlike applying date() to the timestamp column of every row.
+    """
+    start_unix = int(datetime.combine(start, time.min).timestamp())
+    end_unix = int(datetime.combine(end + timedelta(days=1), time.min).timestamp())
+    return start_unix, end_unix
+
+
+def stream_query(query: str, params) -> Iterator[bytes]:
+    """Run a query and yield its rows as a JSON array.
+
+    The connection stays open until the last chunk is sent, and a slow
+    client can take a long time to read that far, so this opens its own
+    read-only connection instead of tying up one of the pooled readers.
+    Prime the generator with next() before responding so the query runs,
+    and any database error is raised, before the response has started.
+    """
+    conn = connect(DB_PATH, readonly=True)
+    try:
+        cursor = conn.execute(query, params)
+        yield b""
+        yield from iter_json_array(cursor)
+    finally:
+        conn.close()
+
+
+@router.get("/metrics/today")
+@cached_json(ttl=2)
+def get_memory_metrics_today() -> List[Dict[str, Any]]:
+    """Get today's memory metrics for charting"""
+    today = date.today()
+    with get_db() as conn:
+        cursor = conn.execute("""
+            SELECT pid, session_id, rss_mb, memory_rate_mb_min,
+                   timestamp, timestamp_unix
+            FROM memory_metrics
+            WHERE timestamp_unix >= ? AND timestamp_unix < ?
+            ORDER BY timestamp_unix ASC
+        """, local_day_bounds(today, today))
+        return dicts_from_cursor(cursor)
+
+
+@router.get("/metrics/range")
+def get_memory_metrics_range(
+    start: date,
+    end: date,
+    limit: int = 10000
+) -> List[Dict[str, Any]]:
+    """Get memory metrics for a date range, streamed in batches"""
+    body = stream_query("""
+        SELECT pid, session_id, rss_mb, memory_rate_mb_min,
+               timestamp, timestamp_unix
+        FROM memory_metrics
+        WHERE timestamp_unix >= ? AND timestamp_unix < ?
+        ORDER BY timestamp_unix ASC
+        LIMIT ?
+    """, (*local_day_bounds(start, end), limit))
+    next(body)
+    return StreamingResponse(body, media_type="application/json")
+
+
+@router.get("/events/today")
+def get_memory_events_today() -> List[Dict[str, Any]]:
+    """Get today's memory events"""
+    today = date.today()
+    with get_db() as conn:
+        cursor = conn.execute("""
+            SELECT event_type, pid, session_id, severity,
+                   message, details, timestamp, timestamp_unix
+            FROM memory_events
+            WHERE timestamp_unix >= ? AND timestamp_unix < ?
+            ORDER BY timestamp_unix DESC
+        """, local_day_bounds(today, today))
+        return dicts_from_cursor(cursor)
+
+
+@router.get("/events/range")
+def get_memory_events_range(
+    start: date,
+    end: date,
+    event_type: Optional[str] = None,
+    limit: int = 1000
+) -> List[Dict[str, Any]]:
+    """Get memory events for a date range"""
+    with get_db() as conn:
+        query = """
+            SELECT event_type, pid, session_id, severity,
+                   message, details, timestamp, timestamp_unix
+            FROM memory_events
+            WHERE timestamp_unix >= ? AND timestamp_unix < ?
+        """
+        params = list(local_day_bounds(start, end))
+
+        if event_type:
+            query += " AND event_type = ?"
+            params.append(event_type)
+
+        query += " ORDER BY timestamp_unix DESC LIMIT ?"
+        params.append(limit)
+
+        cursor = conn.execute(query, params)
+        return dicts_from_cursor(cursor)
+
+
+@router.get("/sessions")
+@cached_json(ttl=2)
+def get_memory_sessions() -> List[Dict[str, Any]]:
+    """Get list of Claude sessions with current memory info"""
+    with get_db() as conn:
+        # Get latest metrics for each PID (active sessions) in one pass.
+        # The unary + on pid stops the planner from walking the whole
+        # pid index for the window; it range-searches the last hour on
+        # the timestamp index and sorts just those rows instead.
+        cursor = conn.execute("""
+            SELECT pid, session_id, rss_mb, rate, command, timestamp, source_device
+            FROM (
+                SELECT pid, session_id, rss_mb, memory_rate_mb_min as rate,
+                       command, timestamp, source_device,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY +pid ORDER BY timestamp_unix DESC
+                       ) as rn
+                FROM memory_metrics
+                WHERE timestamp_unix > (strftime('%s', 'now') - 3600)
+            )
+            WHERE rn = 1
+            ORDER BY rss_mb DESC
+        """)
+        return dicts_from_cursor(cursor)
+
+
+LOW_MEMORY_CONTROL_DIR = Path("/var/log/claude-memory/low-memory-mode")
+_control_dir_ready = False  # mkdir once per process, not on every toggle
+
+
+def write_control_file(control_file: Path) -> None:
+    """Create or truncate a control file holding "1"."""
+    fd = os.open(control_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, b"1")
+    finally:
+        os.close(fd)
+
+
+@router.post("/sessions/{pid}/low-memory-mode")
+def toggle_low_memory_mode(pid: int, enabled: bool = True) -> Dict[str, Any]:
+    """Toggle low-memory mode for a specific Claude session"""
+    global _control_dir_ready
+
+    # Write to control file that hooks can read
+    if not _control_dir_ready:
+        LOW_MEMORY_CONTROL_DIR.mkdir(parents=True, exist_ok=True)
+        _control_dir_ready = True
+
+    control_file = LOW_MEMORY_CONTROL_DIR / str(pid)
+
+    if enabled:
+        try:
+            write_control_file(control_file)
+        except FileNotFoundError:
+            # The directory was removed since it was created; make it again
+            LOW_MEMORY_CONTROL_DIR.mkdir(parents=True, exist_ok=True)
+            write_control_file(control_file)
+    else:
+        control_file.unlink(missing_ok=True)
+
+    return {"success": True, "pid": pid, "low_memory_mode": enabled}
@@ -0,0 +1,82 @@
+"""Response classes for the Datalake API"""
+import functools
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Iterator
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+
+def orjson_default(obj: Any) -> Any:
+    """Serialize types orjson doesn't handle natively"""
+    if isinstance(obj, sqlite3.Row):
+        return dict(zip(obj.keys(), tuple(obj)))
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode content the same way ORJSONResponse does"""
+    return orjson.dumps(
+        content,
+        default=orjson_default,
+        option=orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS,
+    )
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response serialized with orjson instead of stdlib json"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def cached_json(ttl: float, maxsize: int = 32) -> Callable:
+    """Cache a handler's encoded JSON body for ttl seconds, keyed by arguments.
+
+    Meant for dashboard-polled endpoints whose data moves on the order of
+    seconds: repeat calls within the TTL skip both the query and encoding.
+    """
+    def decorator(func: Callable) -> Callable:
+        entries: dict = {}
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            with lock:
+                entry = entries.get(key)
+            if entry is None or entry[0] <= now:
+                body = dumps(func(*args, **kwargs))
+                with lock:
+                    entries.pop(key, None)
+                    if len(entries) >= maxsize:
+                        entries.pop(next(iter(entries)))  # Oldest first
+                    entries[key] = (now + ttl, body)
+                entry = (now + ttl, body)
+            return Response(content=entry[1], media_type="application/json")
+
+        return wrapper
+
+    return decorator
+
+
+def iter_json_array(cursor: sqlite3.Cursor, batch_size: int = 500) -> Iterator[bytes]:
+    """Yield a cursor's rows as a JSON array of objects, one batch at a time.
+
+    Only batch_size rows are held in memory at once, and each chunk is a
+    single yield so a StreamingResponse makes one threadpool hop per batch
+    rather than per row.
+    """
+    columns = [col[0] for col in cursor.description]
+    yield b"["
+    separator = b""
+    while rows := cursor.fetchmany(batch_size):
+        yield separator + b",".join(
+            orjson.dumps(dict(zip(columns, row)), option=orjson.OPT_NON_STR_KEYS)
+            for row in rows
+        )
+        separator = b","
+    yield b"]"
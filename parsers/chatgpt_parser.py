@@ -10,7 +10,6 @@ Usage:
     python3 chatgpt_parser.py --import /path/to/conversations.zip --db datalake.db
 """
 
-import json
 import sys
 import argparse
 import sqlite3
@@ -19,7 +18,62 @@ import zipfile
 import shutil
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
+from types import MappingProxyType
+from typing import Dict, List, Any, Optional, Tuple, BinaryIO, Iterator
+
+# The web UI runs this script with the system python3, which may not have
+# the project's dependencies installed
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+# Read-only stand-in for missing author/metadata objects, so lookups on the
+# per-message path don't allocate a fresh {} each time
+_EMPTY = MappingProxyType({})
+
+# Tuned for bulk imports; WAL also lets the API keep reading meanwhile
+IMPORT_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # Safe with WAL; skips fsync on every commit
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-131072",  # 128 MiB
+    "PRAGMA mmap_size=268435456",  # 256 MiB
+    "PRAGMA busy_timeout=5000",
+)
+
+# Only run for conversations that are new or newer than the stored copy
+_SQL_UPSERT_CONVERSATION = """
+    INSERT INTO chatgpt_conversations
+    (conversation_id, title, create_time, update_time, model_slug,
+     is_archived, is_starred, import_id, source_device)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(conversation_id) DO UPDATE
+    SET title = excluded.title, update_time = excluded.update_time,
+        model_slug = excluded.model_slug, is_archived = excluded.is_archived,
+        is_starred = excluded.is_starred, import_id = excluded.import_id
+    RETURNING id
+"""
+
+_SQL_DELETE_MESSAGES = "DELETE FROM chatgpt_messages WHERE conversation_id = ?"
+
+_SQL_INSERT_MESSAGES = """
+    INSERT INTO chatgpt_messages
+    (conversation_id, message_id, parent_id, role, content_type,
+     content_text, create_time, model_slug, sequence_number)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_UPDATE_MESSAGE_COUNT = "UPDATE chatgpt_conversations SET message_count = ? WHERE id = ?"
+
+# Message rows buffered across conversations before each executemany
+MESSAGE_BATCH_SIZE = 5000
 
 
 def parse_message_tree(mapping: Dict[str, Any], node_id: str, visited: set = None) -> List[Dict[str, Any]]:
@@ -37,28 +91,96 @@ def parse_message_tree(mapping: Dict[str, Any], node_id: str, visited: set = Non
     if visited is None:
         visited = set()
 
-    if node_id in visited or node_id not in mapping:
-        return []
-
-    visited.add(node_id)
-    node = mapping[node_id]
     messages = []
+    # Explicit stack rather than recursion: long threads are thousands of
+    # nodes deep. Children are pushed reversed so they pop in order.
+    stack = [node_id]
+    while stack:
+        node_id = stack.pop()
+        if node_id in visited or node_id not in mapping:
+            continue
+
+        visited.add(node_id)
+        node = mapping[node_id]
+
+        # Add current message if it exists
+        if node.get('message') is not None:
+            msg = node['message']
+            # Skip system messages that are visually hidden
+            metadata = msg.get('metadata')
+            if not (metadata and metadata.get('is_visually_hidden_from_conversation')):
+                # Add parent_id for threading
+                msg['_parent_id'] = node.get('parent')
+                messages.append(msg)
+
+        stack.extend(reversed(node.get('children', [])))
 
-    # Add current message if it exists
-    if node.get('message') is not None:
-        msg = node['message']
-        # Skip system messages that are visually hidden
-        metadata = msg.get('metadata', {})
-        if not metadata.get('is_visually_hidden_from_conversation', False):
-            # Add parent_id for threading
-            msg['_parent_id'] = node.get('parent')
-            messages.append(msg)
+    return messages
 
-    # Process all children
-    for child_id in node.get('children', []):
-        messages.extend(parse_message_tree(mapping, child_id, visited))
 
-    return messages
+def find_root_ids(mapping: Dict[str, Any]) -> List[str]:
+    """
+    Find the nodes to start traversal from.
+
+    The root is the node without a parent (or whose parent isn't in the
+    export); mapping order isn't guaranteed to put it first. Falls back to
+    the first node if every node has a parent, e.g. a cyclic mapping.
+    """
+    roots = [node_id for node_id, node in mapping.items()
+             if node.get('parent') not in mapping]
+    if not roots and mapping:
+        roots.append(next(iter(mapping)))
+    return roots
+
+
+def _text_content(content: Dict[str, Any]) -> str:
+    """Join the parts of a plain text message."""
+    parts = content.get('parts') or ()
+    if all(type(part) is str for part in parts):
+        # The usual case; empty strings add nothing to the join
+        return ''.join(parts)
+    return ''.join([str(part) for part in parts if part])
+
+
+def _code_content(content: Dict[str, Any]) -> str:
+    """Wrap a code message in a fenced block."""
+    text = content.get('text', '')
+    return f"```\n{text}\n```"
+
+
+def _execution_output_content(content: Dict[str, Any]) -> str:
+    """Label tool execution output."""
+    text = content.get('text', '')
+    return f"[Execution Output]\n{text}"
+
+
+def _multimodal_text_content(content: Dict[str, Any]) -> str:
+    """Join text parts, with a placeholder for each image."""
+    parts = content.get('parts', [])
+    result = []
+    for part in parts:
+        if isinstance(part, str):
+            result.append(part)
+        elif isinstance(part, dict):
+            if part.get('content_type') == 'image_asset_pointer':
+                result.append('[Image]')
+            elif 'text' in part:
+                result.append(part['text'])
+    return ''.join(result)
+
+
+def _fallback_content(content: Dict[str, Any]) -> str:
+    """Take the first part of any other content type."""
+    return str(content.get('parts', [''])[0] if content.get('parts') else '')
+
+
+# content_type -> text extractor, looked up once per message
+_CONTENT_HANDLERS = {
+    'text': _text_content,
+    'code': _code_content,
+    'execution_output': _execution_output_content,
+    'multimodal_text': _multimodal_text_content,
+}
 
 
 def extract_text_content(message: Dict[str, Any]) -> Tuple[str, str]:
@@ -70,59 +192,52 @@ def extract_text_content(message: Dict[str, Any]) -> Tuple[str, str]:
     """
     content = message.get('content', {})
     content_type = content.get('content_type', 'text')
+    handler = _CONTENT_HANDLERS.get(content_type, _fallback_content)
+    return handler(content), content_type
+
 
-    # Handle different content types
-    if content_type == 'text':
-        parts = content.get('parts', [])
-        text = ''.join(str(part) for part in parts if part)
-        return text, content_type
-
-    elif content_type == 'code':
-        text = content.get('text', '')
-        return f"```\n{text}\n```", content_type
-
-    elif content_type == 'execution_output':
-        text = content.get('text', '')
-        return f"[Execution Output]\n{text}", content_type
-
-    elif content_type == 'multimodal_text':
-        parts = content.get('parts', [])
-        result = []
-        for part in parts:
-            if isinstance(part, str):
-                result.append(part)
-            elif isinstance(part, dict):
-                if part.get('content_type') == 'image_asset_pointer':
-                    result.append('[Image]')
-                elif 'text' in part:
-                    result.append(part['text'])
-        return ''.join(result), content_type
-
-    # Fallback
-    text = str(content.get('parts', [''])[0] if content.get('parts') else '')
-    return text, content_type
+def iter_conversations(fp: BinaryIO) -> Iterator[Dict[str, Any]]:
+    """
+    Yield conversations one at a time from an open conversations.json.
+
+    With ijson only one conversation is held in memory at a time, rather
+    than the whole export; without it, fall back to parsing the file at once.
+    """
+    if ijson is None:
+        yield from json_loads(fp.read())
+    else:
+        # use_float: numbers as float, not Decimal, so sqlite3 can bind them
+        yield from ijson.items(fp, 'item', use_float=True)
 
 
 def hash_file(path: Path) -> str:
     """Calculate SHA256 hash of a file."""
-    sha256 = hashlib.sha256()
     with open(path, 'rb') as f:
-        while chunk := f.read(8192):
+        if hasattr(hashlib, 'file_digest'):  # Python 3.11+
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        sha256 = hashlib.sha256()
+        while chunk := f.read(1 << 20):
             sha256.update(chunk)
     return sha256.hexdigest()
 
 
-def store_raw_zip(zip_path: Path, data_dir: Path) -> Path:
+def store_raw_zip(zip_path: Path, data_dir: Path, zip_hash: Optional[str] = None) -> Path:
     """
     Store raw zip file in datalake imports directory.
 
+    Args:
+        zip_path: Export zip to store
+        data_dir: Datalake data directory
+        zip_hash: SHA256 of the zip if already computed, to skip re-reading it
+
     Returns:
         Path where zip was stored
     """
     imports_dir = data_dir / 'imports' / 'chatgpt'
     imports_dir.mkdir(parents=True, exist_ok=True)
 
-    zip_hash = hash_file(zip_path)
+    if zip_hash is None:
+        zip_hash = hash_file(zip_path)
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     stored_name = f"{zip_hash[:8]}_{zip_path.stem}_{timestamp}.zip"
     stored_path = imports_dir / stored_name
@@ -136,8 +251,11 @@ class ChatGPTImporter:
 
     def __init__(self, db_path: str):
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
-        self.conn.row_factory = sqlite3.Row
+        # Autocommit mode: import_from_zip manages its own transaction
+        self.conn = sqlite3.connect(db_path, isolation_level=None)
+        self._pending_messages: List[tuple] = []
+        for pragma in IMPORT_PRAGMAS:
+            self.conn.execute(pragma)
 
     def import_from_zip(self, zip_path: Path, data_dir: Path, source_device: str) -> Dict[str, int]:
         """
@@ -156,148 +274,188 @@ class ChatGPTImporter:
         ).fetchone()
 
         if existing:
-            print(f"⚠ Zip file already imported (import ID {existing['id']}, {existing['conversation_count']} conversations)")
+            existing_id, conversation_count = existing
+            print(f"⚠ Zip file already imported (import ID {existing_id}, {conversation_count} conversations)")
             return {'conversations_new': 0, 'conversations_updated': 0, 'messages_imported': 0}
 
-        # Extract conversations.json from zip
         with zipfile.ZipFile(zip_path, 'r') as zf:
             try:
-                conversations_data = zf.read('conversations.json')
+                zf.getinfo('conversations.json')
             except KeyError:
                 print("Error: conversations.json not found in zip file")
                 return {'conversations_new': 0, 'conversations_updated': 0, 'messages_imported': 0}
 
-        conversations = json.loads(conversations_data)
+            # Store raw zip
+            stored_zip_path = store_raw_zip(zip_path, data_dir, zip_hash)
 
-        # Store raw zip
-        stored_zip_path = store_raw_zip(zip_path, data_dir)
+            # Take the write lock up front so the import commits (or rolls back)
+            # as one unit instead of upgrading from a shared lock mid-way
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                deferred_indexes = self._drop_message_indexes_if_empty()
+
+                # Create import record; the count is filled in once streamed
+                cursor = self.conn.cursor()
+                cursor.execute("""
+                    INSERT INTO chatgpt_imports (zip_hash, original_filename, zip_path, conversation_count, source_device)
+                    VALUES (?, ?, ?, NULL, ?)
+                """, (zip_hash, zip_path.name, str(stored_zip_path), source_device))
+                import_id = cursor.lastrowid
+
+                # One query up front instead of a lookup per conversation
+                stored = self._load_stored_versions()
+
+                stats = {
+                    'conversations_new': 0,
+                    'conversations_updated': 0,
+                    'messages_imported': 0
+                }
+                conversation_count = 0
+
+                # Process each conversation as it's parsed
+                with zf.open('conversations.json') as fp:
+                    for conv in iter_conversations(fp):
+                        conversation_count += 1
+                        conv_stats = self._import_conversation(conv, import_id, source_device, stored, cursor)
+                        if conv_stats['is_new']:
+                            stats['conversations_new'] += 1
+                        else:
+                            stats['conversations_updated'] += 1
+                        stats['messages_imported'] += conv_stats['messages_imported']
+                self._flush_messages(cursor)
+
+                # Update import record with conversation and message counts
+                cursor.execute("""
+                    UPDATE chatgpt_imports SET conversation_count = ?, message_count = ? WHERE id = ?
+                """, (conversation_count, stats['messages_imported'], import_id))
+
+                # One sort per index instead of a B-tree insert per row
+                for create_sql in deferred_indexes:
+                    self.conn.execute(create_sql)
+            except Exception:
+                self._pending_messages.clear()
+                self.conn.execute("ROLLBACK")
+                # Parse errors now surface after the copy; don't keep a zip
+                # that no import record points to
+                stored_zip_path.unlink(missing_ok=True)
+                raise
+            self.conn.execute("COMMIT")
 
-        # Create import record
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT INTO chatgpt_imports (zip_hash, original_filename, zip_path, conversation_count, source_device)
-            VALUES (?, ?, ?, ?, ?)
-        """, (zip_hash, zip_path.name, str(stored_zip_path), len(conversations), source_device))
-        import_id = cursor.lastrowid
+        return stats
+
+    def _drop_message_indexes_if_empty(self) -> List[str]:
+        """
+        Drop the chatgpt_messages indexes ahead of a first, bulk import.
 
-        stats = {
-            'conversations_new': 0,
-            'conversations_updated': 0,
-            'messages_imported': 0
+        Only done while the table is empty: exports always contain the full
+        history, so later imports are mostly skips, and rebuilding every
+        index then would cost more than the inserts it saves. Must be
+        called inside the import transaction.
+
+        Returns:
+            CREATE INDEX statements to run once the rows are loaded
+        """
+        if self.conn.execute("SELECT 1 FROM chatgpt_messages LIMIT 1").fetchone():
+            return []
+
+        indexes = self.conn.execute("""
+            SELECT name, sql FROM sqlite_master
+            WHERE type = 'index' AND tbl_name = 'chatgpt_messages' AND sql IS NOT NULL
+        """).fetchall()
+        for name, _ in indexes:
+            self.conn.execute(f'DROP INDEX "{name}"')
+        return [create_sql for _, create_sql in indexes]
+
+    def _flush_messages(self, cursor: sqlite3.Cursor) -> None:
+        """Insert all buffered message rows with one executemany."""
+        if self._pending_messages:
+            cursor.executemany(_SQL_INSERT_MESSAGES, self._pending_messages)
+            self._pending_messages.clear()
+
+    def _load_stored_versions(self) -> Dict[str, Tuple[int, Optional[float]]]:
+        """Map every stored conversation_id to its (id, update_time)."""
+        return {
+            conversation_id: (db_id, update_time)
+            for conversation_id, db_id, update_time in self.conn.execute(
+                "SELECT conversation_id, id, update_time FROM chatgpt_conversations"
+            )
         }
 
-        # Process each conversation
-        for conv in conversations:
-            conv_stats = self._import_conversation(conv, import_id, source_device)
-            if conv_stats['is_new']:
-                stats['conversations_new'] += 1
-            else:
-                stats['conversations_updated'] += 1
-            stats['messages_imported'] += conv_stats['messages_imported']
-
-        # Update import record with message count
-        cursor.execute("""
-            UPDATE chatgpt_imports SET message_count = ? WHERE id = ?
-        """, (stats['messages_imported'], import_id))
-
-        self.conn.commit()
-        return stats
+    def _import_conversation(self, conv: Dict[str, Any], import_id: int, source_device: str,
+                             stored: Dict[str, Tuple[int, Optional[float]]],
+                             cursor: Optional[sqlite3.Cursor] = None) -> Dict:
+        """
+        Import a single conversation, reusing cursor if given.
 
-    def _import_conversation(self, conv: Dict[str, Any], import_id: int, source_device: str) -> Dict:
-        """Import a single conversation."""
+        stored is the result of _load_stored_versions() and is kept up to
+        date as conversations are written.
+        """
+        if cursor is None:
+            cursor = self.conn.cursor()
         conversation_id = conv['id']
         create_time = conv.get('create_time')
         update_time = conv.get('update_time')
 
-        # Check if conversation exists
-        existing = self.conn.execute(
-            "SELECT id, update_time FROM chatgpt_conversations WHERE conversation_id = ?",
-            (conversation_id,)
-        ).fetchone()
-
+        existing = stored.get(conversation_id)
         is_new = existing is None
 
         if existing:
             # Check if this version is newer
-            if update_time and existing['update_time'] and update_time <= existing['update_time']:
+            stored_update_time = existing[1]
+            if update_time and stored_update_time and update_time <= stored_update_time:
                 # Skip - older or same version
                 return {'is_new': False, 'messages_imported': 0}
 
-            # Update conversation
-            db_conv_id = existing['id']
-            self.conn.execute("""
-                UPDATE chatgpt_conversations
-                SET title = ?, update_time = ?, model_slug = ?,
-                    is_archived = ?, is_starred = ?, import_id = ?
-                WHERE id = ?
-            """, (
-                conv.get('title'),
-                update_time,
-                conv.get('default_model_slug'),
-                conv.get('is_archived', 0),
-                conv.get('is_starred', 0),
-                import_id,
-                db_conv_id
-            ))
-
-            # Delete old messages
-            self.conn.execute("DELETE FROM chatgpt_messages WHERE conversation_id = ?", (db_conv_id,))
-        else:
-            # Insert new conversation
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                INSERT INTO chatgpt_conversations
-                (conversation_id, title, create_time, update_time, model_slug,
-                 is_archived, is_starred, import_id, source_device)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                conversation_id,
-                conv.get('title'),
-                create_time,
-                update_time,
-                conv.get('default_model_slug'),
-                conv.get('is_archived', 0),
-                conv.get('is_starred', 0),
-                import_id,
-                source_device
-            ))
-            db_conv_id = cursor.lastrowid
+        db_conv_id = cursor.execute(_SQL_UPSERT_CONVERSATION, (
+            conversation_id,
+            conv.get('title'),
+            create_time,
+            update_time,
+            conv.get('default_model_slug'),
+            conv.get('is_archived', 0),
+            conv.get('is_starred', 0),
+            import_id,
+            source_device
+        )).fetchone()[0]
+        stored[conversation_id] = (db_conv_id, update_time)
+
+        if not is_new:
+            # Delete old messages, including any still buffered for an
+            # earlier copy of this conversation in the same export
+            self._flush_messages(cursor)
+            cursor.execute(_SQL_DELETE_MESSAGES, (db_conv_id,))
 
         # Parse and insert messages
         mapping = conv.get('mapping', {})
-        if not mapping:
-            return {'is_new': is_new, 'messages_imported': 0}
-
-        # Find root node
-        root_id = list(mapping.keys())[0]
-        messages = parse_message_tree(mapping, root_id)
+        messages = []
+        visited = set()
+        for root_id in find_root_ids(mapping):
+            messages.extend(parse_message_tree(mapping, root_id, visited))
 
-        message_count = 0
+        # Sized up front: the message count is known, so no regrowth
+        rows = [None] * len(messages)
         for seq, msg in enumerate(messages):
+            get = msg.get
             content_text, content_type = extract_text_content(msg)
-
-            self.conn.execute("""
-                INSERT INTO chatgpt_messages
-                (conversation_id, message_id, parent_id, role, content_type,
-                 content_text, create_time, model_slug, sequence_number)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
+            rows[seq] = (
                 db_conv_id,
-                msg.get('id'),
-                msg.get('_parent_id'),
-                msg.get('author', {}).get('role', 'unknown'),
+                get('id'),
+                get('_parent_id'),
+                (get('author') or _EMPTY).get('role', 'unknown'),
                 content_type,
                 content_text,
-                msg.get('create_time'),
-                msg.get('metadata', {}).get('model_slug'),
+                get('create_time'),
+                (get('metadata') or _EMPTY).get('model_slug'),
                 seq
-            ))
-            message_count += 1
+            )
+
+        self._pending_messages.extend(rows)
+        if len(self._pending_messages) >= MESSAGE_BATCH_SIZE:
+            self._flush_messages(cursor)
+        message_count = len(rows)
 
         # Update message count
-        self.conn.execute("""
-            UPDATE chatgpt_conversations SET message_count = ? WHERE id = ?
-        """, (message_count, db_conv_id))
+        cursor.execute(_SQL_UPDATE_MESSAGE_COUNT, (message_count, db_conv_id))
 
         return {'is_new': is_new, 'messages_imported': message_count}
 
@@ -11,15 +11,166 @@ Designed for ingestion into the datalake database.
 """
 
 import json
+import mmap
 import os
+import queue
 import sqlite3
-from dataclasses import dataclass, field
+import threading
+from dataclasses import dataclass, field, fields
 from datetime import datetime
+from itertools import islice, repeat
 from pathlib import Path
 from typing import Optional, Iterator, Any
 import re
 import logging
 
+# Tuned for bulk ingest; WAL also lets the API keep reading meanwhile
+INGEST_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # Safe with WAL; skips fsync on every commit
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-262144",  # 256 MiB
+    "PRAGMA mmap_size=1073741824",  # 1 GiB
+    "PRAGMA wal_autocheckpoint=10000",  # Pages; fewer checkpoints mid-ingest
+    "PRAGMA busy_timeout=5000",
+)
+
+# Session files are named <uuid>.jsonl
+_SESSION_FILE_RE = re.compile(
+    r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.jsonl$'
+)
+_SESSION_FILE_LEN = 42
+
+# Parsed sessions buffered between the parser thread and the writer
+PIPELINE_DEPTH = 16
+
+# Session files hinted to the kernel ahead of the one being parsed
+SESSION_PREFETCH_DEPTH = 128
+
+# History rows per executemany; a failing batch is retried one row at a time
+INSERT_BATCH_SIZE = 1000
+
+# scripts/refresh-claude.sh runs this with the system python3, which may not
+# have the project's dependencies installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Only parsing goes through orjson. Stored JSON columns are still written
+# with json.dumps, so new rows match the text of rows already in the database.
+json_loads = orjson.loads if orjson is not None else json.loads
+
+
+def iter_lines(path: Path) -> Iterator[bytes]:
+    """Yield a file's lines as bytes, read through a read-only mmap.
+
+    mmap.readline splits in C straight from the page cache, which beats both
+    buffered file iteration and a Python-level find(b'\\n') loop.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return  # mmap refuses zero-length files
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, 'madvise'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            yield from iter(mm.readline, b'')
+
+
+def count_lines(path: Path) -> int:
+    """Count a file's lines, including a last one without a newline."""
+    lines = 0
+    last = b'\n'
+    with open(path, 'rb') as f:
+        # bytes.count scans in C; no per-line objects are created
+        while chunk := f.read(1 << 20):
+            lines += chunk.count(b'\n')
+            last = chunk[-1:]
+    return lines + (last != b'\n')
+
+
+def parse_timestamp(ts: str) -> datetime:
+    """Parse an ISO-8601 timestamp such as '2026-01-12T00:59:00.000Z'."""
+    try:
+        # C-implemented and 'Z'-aware from Python 3.11 on
+        return datetime.fromisoformat(ts)
+    except ValueError:
+        # Older system interpreters only take a numeric UTC offset
+        return datetime.fromisoformat(ts.replace('Z', '+00:00'))
+
+
+def is_session_file(name: str) -> bool:
+    """Check whether a file name is a session's <uuid>.jsonl."""
+    # The length check turns away agent-*.jsonl and the like without the regex
+    return len(name) == _SESSION_FILE_LEN and _SESSION_FILE_RE.match(name) is not None
+
+
+def iter_in_thread(iterable, maxsize: int = PIPELINE_DEPTH) -> Iterator[Any]:
+    """Yield items of iterable as a producer thread computes them.
+
+    The thread runs at most maxsize items ahead through a bounded queue, so
+    the caller's work (SQLite, which releases the GIL while stepping) overlaps
+    with producing the next items. Exceptions raised by the producer are
+    re-raised here; closing the generator early stops the thread.
+    """
+    items: queue.Queue = queue.Queue(maxsize)
+    done = object()
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except BaseException as e:
+            put((done, e))
+        else:
+            put((done, None))
+
+    thread = threading.Thread(target=produce, name='claude-parser', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def prefetch_file(path: Path) -> None:
+    """Ask the kernel to start reading a file into the page cache.
+
+    POSIX_FADV_WILLNEED queues readahead and returns immediately, so hinting
+    several files at once lets their reads proceed in parallel. A no-op where
+    posix_fadvise isn't available.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -29,33 +180,88 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def extract_content(message: dict) -> tuple[str, str, int, int, int]:
+    """Extract text, thinking, and counts from message content.
+
+    Called once per message, so it is kept a plain function of the message
+    dict: no parser state, nothing to look up on self.
+    """
+    content = message.get('content', [])
+    if isinstance(content, str):
+        return content, '', 0, 0, 0
+
+    text_parts = []
+    thinking_parts = []
+    image_count = 0
+    tool_use_count = 0
+    tool_result_count = 0
+
+    # Branches are ordered by how often each block type turns up in real
+    # sessions: tool calls and their results far outnumber everything else
+    for item in content:
+        if isinstance(item, dict):
+            item_type = item.get('type', '')
+            if item_type == 'tool_result':
+                tool_result_count += 1
+            elif item_type == 'tool_use':
+                tool_use_count += 1
+            elif item_type == 'text':
+                text_parts.append(item.get('text', ''))
+            elif item_type == 'thinking':
+                thinking_parts.append(item.get('thinking', ''))
+            elif item_type == 'image':
+                image_count += 1
+        elif isinstance(item, str):
+            text_parts.append(item)
+
+    return (
+        '\n'.join(text_parts),
+        '\n'.join(thinking_parts),
+        image_count,
+        tool_use_count,
+        tool_result_count
+    )
+
+
 @dataclass
-class ClaudeMessage:
-    """Represents a parsed Claude message."""
-    message_uuid: str
-    parent_uuid: Optional[str]
-    message_type: str  # 'user', 'assistant', 'summary', 'snapshot'
-    user_type: Optional[str]
-    role: Optional[str]
-    model: Optional[str]
-    content_text: str
-    content_thinking: str
-    content_images: int
-    content_tool_uses: int
-    content_tool_results: int
-    is_sidechain: bool
-    cwd: Optional[str]
-    git_branch: Optional[str]
-    input_tokens: int
-    output_tokens: int
-    cache_read_tokens: int
-    cache_creation_tokens: int
-    stop_reason: Optional[str]
-    request_id: Optional[str]
-    timestamp: str
-    sequence_number: int
-    todos: str
-    metadata: str
+class MessageColumns:
+    """A session's parsed messages, stored as one list per column.
+
+    Parallel lists hold a pointer per value instead of a full object per
+    message. Field order matches the claude_messages INSERT, so rows() can
+    zip the columns straight into executemany.
+    """
+    message_uuid: list[str] = field(default_factory=list)
+    parent_uuid: list[Optional[str]] = field(default_factory=list)
+    message_type: list[str] = field(default_factory=list)  # 'user', 'assistant'
+    user_type: list[Optional[str]] = field(default_factory=list)
+    role: list[Optional[str]] = field(default_factory=list)
+    model: list[Optional[str]] = field(default_factory=list)
+    content_text: list[str] = field(default_factory=list)
+    content_thinking: list[str] = field(default_factory=list)
+    content_images: list[int] = field(default_factory=list)
+    content_tool_uses: list[int] = field(default_factory=list)
+    content_tool_results: list[int] = field(default_factory=list)
+    is_sidechain: list[int] = field(default_factory=list)  # 0/1
+    cwd: list[Optional[str]] = field(default_factory=list)
+    git_branch: list[Optional[str]] = field(default_factory=list)
+    input_tokens: list[int] = field(default_factory=list)
+    output_tokens: list[int] = field(default_factory=list)
+    cache_read_tokens: list[int] = field(default_factory=list)
+    cache_creation_tokens: list[int] = field(default_factory=list)
+    stop_reason: list[Optional[str]] = field(default_factory=list)
+    request_id: list[Optional[str]] = field(default_factory=list)
+    timestamp: list[str] = field(default_factory=list)
+    sequence_number: list[int] = field(default_factory=list)
+    todos: list[str] = field(default_factory=list)
+    metadata: list[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.message_uuid)
+
+    def rows(self, session_db_id: int) -> Iterator[tuple]:
+        """Yield claude_messages rows, each prefixed with the session's id."""
+        return zip(repeat(session_db_id), *(getattr(self, f.name) for f in fields(self)))
 
 
 @dataclass
@@ -80,7 +286,7 @@ class ClaudeSession:
     started_at: str
     ended_at: Optional[str]
     duration_seconds: Optional[float]
-    messages: list[ClaudeMessage] = field(default_factory=list)
+    messages: MessageColumns = field(default_factory=MessageColumns)
     subagents: list[dict] = field(default_factory=list)
 
 
@@ -104,6 +310,8 @@ class ClaudeParser:
         self.source_device = source_device
         self.history_file = self.claude_dir / "history.jsonl"
         self.projects_dir = self.claude_dir / "projects"
+        # Listing left by get_stats() for the next parse_sessions() to use
+        self._session_files: Optional[list[tuple[Path, str, Path]]] = None
 
     def parse_history(self) -> Iterator[ClaudeHistoryEntry]:
         """Parse history.jsonl file."""
@@ -113,69 +321,35 @@ class ClaudeParser:
 
         logger.info(f"Parsing history from: {self.history_file}")
 
-        with open(self.history_file, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                try:
-                    data = json.loads(line.strip())
-
-                    # Skip non-history entries
-                    if 'display' not in data:
-                        continue
-
-                    timestamp_unix = data.get('timestamp', 0)
-                    timestamp_iso = datetime.fromtimestamp(
-                        timestamp_unix / 1000
-                    ).isoformat() if timestamp_unix else None
-
-                    yield ClaudeHistoryEntry(
-                        session_id=data.get('sessionId', ''),
-                        display=data.get('display', ''),
-                        pasted_contents=json.dumps(data.get('pastedContents', {})),
-                        project=data.get('project', ''),
-                        source_device=self.source_device,
-                        timestamp=timestamp_iso,
-                        timestamp_unix=timestamp_unix
-                    )
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Failed to parse history line {line_num}: {e}")
-                except Exception as e:
-                    logger.error(f"Error processing history line {line_num}: {e}")
-
-    def _extract_content(self, message: dict) -> tuple[str, str, int, int, int]:
-        """Extract text, thinking, and counts from message content."""
-        content = message.get('content', [])
-        if isinstance(content, str):
-            return content, '', 0, 0, 0
-
-        text_parts = []
-        thinking_parts = []
-        image_count = 0
-        tool_use_count = 0
-        tool_result_count = 0
-
-        for item in content:
-            if isinstance(item, str):
-                text_parts.append(item)
-            elif isinstance(item, dict):
-                item_type = item.get('type', '')
-                if item_type == 'text':
-                    text_parts.append(item.get('text', ''))
-                elif item_type == 'thinking':
-                    thinking_parts.append(item.get('thinking', ''))
-                elif item_type == 'image':
-                    image_count += 1
-                elif item_type == 'tool_use':
-                    tool_use_count += 1
-                elif item_type == 'tool_result':
-                    tool_result_count += 1
-
-        return (
-            '\n'.join(text_parts),
-            '\n'.join(thinking_parts),
-            image_count,
-            tool_use_count,
-            tool_result_count
-        )
+        for line_num, line in enumerate(iter_lines(self.history_file), 1):
+            try:
+                data = json_loads(line)
+
+                # Skip non-history entries
+                if 'display' not in data:
+                    continue
+
+                timestamp_unix = data.get('timestamp', 0)
+                timestamp_iso = datetime.fromtimestamp(
+                    timestamp_unix / 1000
+                ).isoformat() if timestamp_unix else None
+
+                # Most prompts paste nothing; only encode when there's content
+                pasted = data.get('pastedContents')
+
+                yield ClaudeHistoryEntry(
+                    session_id=data.get('sessionId', ''),
+                    display=data.get('display', ''),
+                    pasted_contents=json.dumps(pasted) if pasted else '{}',
+                    project=data.get('project', ''),
+                    source_device=self.source_device,
+                    timestamp=timestamp_iso,
+                    timestamp_unix=timestamp_unix
+                )
+            except json.JSONDecodeError as e:
+                logger.warning(f"Failed to parse history line {line_num}: {e}")
+            except Exception as e:
+                logger.error(f"Error processing history line {line_num}: {e}")
 
     def _parse_session_file(self, session_file: Path, session_id: str,
                            project_path: str) -> Optional[ClaudeSession]:
@@ -185,9 +359,9 @@ class ClaudeParser:
 
         logger.debug(f"Parsing session: {session_file}")
 
-        messages: list[ClaudeMessage] = []
-        summaries: list[str] = []
-        models_used: set[str] = set()
+        messages = MessageColumns()
+        summary: Optional[str] = None
+        model_primary: Optional[str] = None
         claude_version = None
         git_branch = None
 
@@ -198,117 +372,120 @@ class ClaudeParser:
         user_count = 0
         assistant_count = 0
 
-        timestamps: list[str] = []
+        # ISO-8601 strings sort lexicographically, so a running min/max works
+        started_at: Optional[str] = None
+        ended_at: Optional[str] = None
 
-        with open(session_file, 'r', encoding='utf-8') as f:
-            for seq_num, line in enumerate(f, 1):
-                try:
-                    data = json.loads(line.strip())
-                    msg_type = data.get('type', 'unknown')
-
-                    if msg_type == 'summary':
-                        summaries.append(data.get('summary', ''))
-                        continue
-
-                    if msg_type in ('user', 'assistant'):
-                        # Get timestamp
-                        ts = data.get('timestamp', '')
-                        if ts:
-                            timestamps.append(ts)
-
-                        # Get version and branch
-                        if not claude_version:
-                            claude_version = data.get('version')
-                        if not git_branch:
-                            git_branch = data.get('gitBranch')
-
-                        # Extract message content
-                        inner_msg = data.get('message', {})
-                        text, thinking, images, tools, results = self._extract_content(inner_msg)
-
-                        # Get model
-                        model = inner_msg.get('model')
-                        if model:
-                            models_used.add(model)
-
-                        # Get usage
-                        usage = inner_msg.get('usage', {})
-                        input_tokens = usage.get('input_tokens', 0)
-                        output_tokens = usage.get('output_tokens', 0)
-                        cache_read = usage.get('cache_read_input_tokens', 0)
-                        cache_creation = usage.get('cache_creation_input_tokens', 0)
-
-                        total_input += input_tokens
-                        total_output += output_tokens
-                        total_cache_read += cache_read
-                        total_cache_creation += cache_creation
-
-                        if msg_type == 'user':
-                            user_count += 1
-                        else:
-                            assistant_count += 1
-
-                        msg = ClaudeMessage(
-                            message_uuid=data.get('uuid', ''),
-                            parent_uuid=data.get('parentUuid'),
-                            message_type=msg_type,
-                            user_type=data.get('userType'),
-                            role=inner_msg.get('role'),
-                            model=model,
-                            content_text=text,
-                            content_thinking=thinking,
-                            content_images=images,
-                            content_tool_uses=tools,
-                            content_tool_results=results,
-                            is_sidechain=data.get('isSidechain', False),
-                            cwd=data.get('cwd'),
-                            git_branch=data.get('gitBranch'),
-                            input_tokens=input_tokens,
-                            output_tokens=output_tokens,
-                            cache_read_tokens=cache_read,
-                            cache_creation_tokens=cache_creation,
-                            stop_reason=inner_msg.get('stop_reason'),
-                            request_id=data.get('requestId'),
-                            timestamp=ts,
-                            sequence_number=seq_num,
-                            todos=json.dumps(data.get('todos', [])),
-                            metadata=json.dumps(data)
-                        )
-                        messages.append(msg)
-
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Failed to parse line {seq_num} in {session_file}: {e}")
-                except Exception as e:
-                    logger.error(f"Error processing line {seq_num} in {session_file}: {e}")
+        for seq_num, line in enumerate(iter_lines(session_file), 1):
+            try:
+                data = json_loads(line)
+                msg_type = data.get('type', 'unknown')
+
+                if msg_type == 'summary':
+                    if summary is None:
+                        summary = data.get('summary', '')
+                    continue
+
+                if msg_type in ('user', 'assistant'):
+                    # Get timestamp
+                    ts = data.get('timestamp', '')
+                    if ts:
+                        if started_at is None or ts < started_at:
+                            started_at = ts
+                        if ended_at is None or ts > ended_at:
+                            ended_at = ts
+
+                    # Get version and branch
+                    if not claude_version:
+                        claude_version = data.get('version')
+                    if not git_branch:
+                        git_branch = data.get('gitBranch')
+
+                    # Extract message content
+                    inner_msg = data.get('message', {})
+                    text, thinking, images, tools, results = extract_content(inner_msg)
+
+                    # Get model
+                    model = inner_msg.get('model')
+                    if model and model_primary is None:
+                        model_primary = model
+
+                    # Get usage
+                    usage = inner_msg.get('usage', {})
+                    input_tokens = usage.get('input_tokens', 0)
+                    output_tokens = usage.get('output_tokens', 0)
+                    cache_read = usage.get('cache_read_input_tokens', 0)
+                    cache_creation = usage.get('cache_creation_input_tokens', 0)
+
+                    total_input += input_tokens
+                    total_output += output_tokens
+                    total_cache_read += cache_read
+                    total_cache_creation += cache_creation
+
+                    if msg_type == 'user':
+                        user_count += 1
+                    else:
+                        assistant_count += 1
+
+                    # Everything that can fail is evaluated before the first
+                    # append, so a bad line never leaves the columns ragged
+                    todos = json.dumps(data.get('todos', []))
+                    metadata = line.decode().rstrip()  # Already JSON; no re-encode
+
+                    messages.message_uuid.append(data.get('uuid', ''))
+                    messages.parent_uuid.append(data.get('parentUuid'))
+                    messages.message_type.append(msg_type)
+                    messages.user_type.append(data.get('userType'))
+                    messages.role.append(inner_msg.get('role'))
+                    messages.model.append(model)
+                    messages.content_text.append(text)
+                    messages.content_thinking.append(thinking)
+                    messages.content_images.append(images)
+                    messages.content_tool_uses.append(tools)
+                    messages.content_tool_results.append(results)
+                    messages.is_sidechain.append(1 if data.get('isSidechain', False) else 0)
+                    messages.cwd.append(data.get('cwd'))
+                    messages.git_branch.append(data.get('gitBranch'))
+                    messages.input_tokens.append(input_tokens)
+                    messages.output_tokens.append(output_tokens)
+                    messages.cache_read_tokens.append(cache_read)
+                    messages.cache_creation_tokens.append(cache_creation)
+                    messages.stop_reason.append(inner_msg.get('stop_reason'))
+                    messages.request_id.append(data.get('requestId'))
+                    messages.timestamp.append(ts)
+                    messages.sequence_number.append(seq_num)
+                    messages.todos.append(todos)
+                    messages.metadata.append(metadata)
+
+            except json.JSONDecodeError as e:
+                logger.warning(f"Failed to parse line {seq_num} in {session_file}: {e}")
+            except Exception as e:
+                logger.error(f"Error processing line {seq_num} in {session_file}: {e}")
 
         if not messages:
             return None
 
         # Calculate duration
-        started_at = min(timestamps) if timestamps else None
-        ended_at = max(timestamps) if timestamps else None
         duration = None
         if started_at and ended_at:
             try:
-                start_dt = datetime.fromisoformat(started_at.replace('Z', '+00:00'))
-                end_dt = datetime.fromisoformat(ended_at.replace('Z', '+00:00'))
+                start_dt = parse_timestamp(started_at)
+                end_dt = parse_timestamp(ended_at)
                 duration = (end_dt - start_dt).total_seconds()
-            except:
+            except (TypeError, ValueError):
                 pass
 
         # Decode project path
         project_decoded = project_path.replace('-', '/')
-        if project_decoded.startswith('/'):
-            pass  # Already correct
-        else:
+        if not project_decoded.startswith('/'):
             project_decoded = '/' + project_decoded
 
         return ClaudeSession(
             session_id=session_id,
             project_path=project_decoded,
             project_encoded=project_path,
-            summary=summaries[0] if summaries else None,
-            model_primary=list(models_used)[0] if models_used else None,
+            summary=summary,
+            model_primary=model_primary,
             claude_version=claude_version,
             git_branch=git_branch,
             total_messages=len(messages),
@@ -326,6 +503,31 @@ class ClaudeParser:
             messages=messages
         )
 
+    def _scan_projects(self) -> tuple[int, list[tuple[Path, str, Path]]]:
+        """List the projects directory.
+
+        Returns the number of project directories and a
+        (session_file, session_id, project_dir) tuple for every session.
+        os.scandir answers is_dir()/is_file() from the directory listing
+        itself, so only symlinks cost a stat() call.
+        """
+        with os.scandir(self.projects_dir) as projects:
+            project_entries = [entry for entry in projects if entry.is_dir()]
+
+        session_files = []
+        for project_entry in project_entries:
+            logger.debug(f"Processing project: {project_entry.name}")
+            project_dir = Path(project_entry.path)
+
+            with os.scandir(project_entry.path) as items:
+                session_files.extend(
+                    (Path(entry.path), entry.name[:-len('.jsonl')], project_dir)
+                    for entry in items
+                    if is_session_file(entry.name) and entry.is_file()
+                )
+
+        return len(project_entries), session_files
+
     def parse_sessions(self) -> Iterator[ClaudeSession]:
         """Parse all session files from projects directory."""
         if not self.projects_dir.exists():
@@ -334,62 +536,56 @@ class ClaudeParser:
 
         logger.info(f"Scanning projects in: {self.projects_dir}")
 
-        for project_dir in self.projects_dir.iterdir():
-            if not project_dir.is_dir():
-                continue
-
-            project_name = project_dir.name
-            logger.debug(f"Processing project: {project_name}")
-
-            # Find session files (UUID format)
-            session_pattern = re.compile(
-                r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.jsonl$'
-            )
-
-            for item in project_dir.iterdir():
-                if not item.is_file():
-                    continue
-
-                if session_pattern.match(item.name):
-                    session_id = item.stem
-                    session = self._parse_session_file(item, session_id, project_name)
-                    if session:
-                        # Look for subagents
-                        session_subdir = project_dir / session_id
-                        if session_subdir.exists() and session_subdir.is_dir():
-                            for subagent_file in session_subdir.glob('agent-*.jsonl'):
-                                session.subagents.append({
-                                    'subagent_id': subagent_file.stem,
-                                    'source_file': str(subagent_file)
-                                })
-
-                        yield session
+        # Reuse the listing from a preceding get_stats() call, but only once
+        session_files = self._session_files
+        self._session_files = None
+        if session_files is None:
+            _, session_files = self._scan_projects()
+        prefetched = 0
+
+        for index, (item, session_id, project_dir) in enumerate(session_files):
+            # Keep the kernel reading up to SESSION_PREFETCH_DEPTH files ahead
+            # of the parser, so cold-cache reads overlap with parsing
+            window_end = min(index + SESSION_PREFETCH_DEPTH, len(session_files))
+            while prefetched < window_end:
+                prefetch_file(session_files[prefetched][0])
+                prefetched += 1
+
+            session = self._parse_session_file(item, session_id, project_dir.name)
+            if session:
+                # Look for subagents
+                session_subdir = project_dir / session_id
+                if session_subdir.exists() and session_subdir.is_dir():
+                    for subagent_file in session_subdir.glob('agent-*.jsonl'):
+                        session.subagents.append({
+                            'subagent_id': subagent_file.stem,
+                            'source_file': str(subagent_file)
+                        })
+
+                yield session
 
     def get_stats(self) -> dict:
-        """Get statistics about available data."""
+        """Get statistics about available data.
+
+        The directory listing made here is kept for the next parse_sessions()
+        call, so a stats-then-ingest run walks projects_dir only once.
+        """
         stats = {
             'history_entries': 0,
             'sessions': 0,
             'total_messages': 0,
-            'projects': set(),
+            'projects': 0,
         }
 
         # Count history entries
         if self.history_file.exists():
-            with open(self.history_file, 'r') as f:
-                stats['history_entries'] = sum(1 for _ in f)
+            stats['history_entries'] = count_lines(self.history_file)
 
         # Count sessions
         if self.projects_dir.exists():
-            for project_dir in self.projects_dir.iterdir():
-                if project_dir.is_dir():
-                    stats['projects'].add(project_dir.name)
-                    for item in project_dir.iterdir():
-                        if item.is_file() and item.suffix == '.jsonl':
-                            if re.match(r'^[0-9a-f]{8}-', item.name):
-                                stats['sessions'] += 1
-
-        stats['projects'] = len(stats['projects'])
+            stats['projects'], self._session_files = self._scan_projects()
+            stats['sessions'] = len(self._session_files)
+
         return stats
 
 
@@ -398,36 +594,62 @@ class DatalakeIngester:
 
     def __init__(self, db_path: str):
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        # Autocommit mode: each ingest call manages its own transaction
+        self.conn = sqlite3.connect(db_path, isolation_level=None)
         self.conn.row_factory = sqlite3.Row
+        for pragma in INGEST_PRAGMAS:
+            self.conn.execute(pragma)
 
     def ingest_history(self, entries: Iterator[ClaudeHistoryEntry]) -> int:
         """Ingest history entries into the database."""
+        sql = '''
+            INSERT OR IGNORE INTO claude_history
+            (session_id, display, pasted_contents, project, source_device,
+             timestamp, timestamp_unix)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        '''
+        rows = (
+            (
+                entry.session_id,
+                entry.display,
+                entry.pasted_contents,
+                entry.project,
+                entry.source_device,
+                entry.timestamp,
+                entry.timestamp_unix
+            )
+            for entry in entries
+        )
         cursor = self.conn.cursor()
         count = 0
 
-        for entry in entries:
-            try:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO claude_history
-                    (session_id, display, pasted_contents, project, source_device,
-                     timestamp, timestamp_unix)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    entry.session_id,
-                    entry.display,
-                    entry.pasted_contents,
-                    entry.project,
-                    entry.source_device,
-                    entry.timestamp,
-                    entry.timestamp_unix
-                ))
-                if cursor.rowcount > 0:
-                    count += 1
-            except sqlite3.Error as e:
-                logger.error(f"Failed to insert history entry: {e}")
-
-        self.conn.commit()
+        self.conn.execute("BEGIN")
+        try:
+            while True:
+                batch = list(islice(rows, INSERT_BATCH_SIZE))
+                if not batch:
+                    break
+                # A batch that fails (e.g. on a value that can't be bound) is
+                # rolled back and replayed row by row to skip just the bad rows
+                self.conn.execute("SAVEPOINT batch")
+                try:
+                    cursor.executemany(sql, batch)
+                    # executemany reports the rows actually inserted
+                    count += cursor.rowcount
+                except sqlite3.Error:
+                    self.conn.execute("ROLLBACK TO batch")
+                    for row in batch:
+                        try:
+                            cursor.execute(sql, row)
+                            count += cursor.rowcount
+                        except sqlite3.Error as e:
+                            logger.error(f"Failed to insert history entry: {e}")
+                self.conn.execute("RELEASE batch")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        self.conn.execute("COMMIT")
         logger.info(f"Ingested {count} history entries")
         return count
 
@@ -435,8 +657,11 @@ class DatalakeIngester:
         """Ingest a session and its messages into the database."""
         cursor = self.conn.cursor()
 
+        self.conn.execute("BEGIN")
         try:
-            # Insert session
+            # Insert session, or take the existing row's id when it's already
+            # there. The no-op DO UPDATE is what makes RETURNING fire for an
+            # existing row; OR IGNORE still skips rows that fail NOT NULL.
             cursor.execute('''
                 INSERT OR IGNORE INTO claude_sessions
                 (session_id, project_path, project_encoded, summary, model_primary,
@@ -445,6 +670,8 @@ class DatalakeIngester:
                  total_cache_read_tokens, total_cache_creation_tokens,
                  source_device, source_file, started_at, ended_at, duration_seconds)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(session_id) DO UPDATE SET session_id = excluded.session_id
+                RETURNING id
             ''', (
                 session.session_id,
                 session.project_path,
@@ -466,79 +693,56 @@ class DatalakeIngester:
                 session.ended_at,
                 session.duration_seconds
             ))
-
-            if cursor.rowcount == 0:
-                # Session already exists, get its ID
-                cursor.execute(
-                    'SELECT id FROM claude_sessions WHERE session_id = ?',
-                    (session.session_id,)
-                )
-                row = cursor.fetchone()
-                session_db_id = row['id'] if row else None
-            else:
-                session_db_id = cursor.lastrowid
-
-            if session_db_id is None:
+            row = cursor.fetchone()
+            if row is None:
+                self.conn.execute("ROLLBACK")
                 return None
+            session_db_id = row[0]
+
+            # A re-ingested session is mostly messages already stored; drop
+            # those here with one indexed read instead of an OR IGNORE probe
+            # of the unique index per row
+            cursor.execute(
+                'SELECT message_uuid FROM claude_messages WHERE session_id = ?',
+                (session_db_id,)
+            )
+            existing = {row[0] for row in cursor}
+            rows = session.messages.rows(session_db_id)
+            if existing:
+                rows = (row for row in rows if row[1] not in existing)
 
             # Insert messages
-            for msg in session.messages:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO claude_messages
-                    (session_id, message_uuid, parent_uuid, message_type, user_type,
-                     role, model, content_text, content_thinking, content_images,
-                     content_tool_uses, content_tool_results, is_sidechain, cwd,
-                     git_branch, input_tokens, output_tokens, cache_read_tokens,
-                     cache_creation_tokens, stop_reason, request_id, timestamp,
-                     sequence_number, todos, metadata)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    session_db_id,
-                    msg.message_uuid,
-                    msg.parent_uuid,
-                    msg.message_type,
-                    msg.user_type,
-                    msg.role,
-                    msg.model,
-                    msg.content_text,
-                    msg.content_thinking,
-                    msg.content_images,
-                    msg.content_tool_uses,
-                    msg.content_tool_results,
-                    1 if msg.is_sidechain else 0,
-                    msg.cwd,
-                    msg.git_branch,
-                    msg.input_tokens,
-                    msg.output_tokens,
-                    msg.cache_read_tokens,
-                    msg.cache_creation_tokens,
-                    msg.stop_reason,
-                    msg.request_id,
-                    msg.timestamp,
-                    msg.sequence_number,
-                    msg.todos,
-                    msg.metadata
-                ))
+            cursor.executemany('''
+                INSERT OR IGNORE INTO claude_messages
+                (session_id, message_uuid, parent_uuid, message_type, user_type,
+                 role, model, content_text, content_thinking, content_images,
+                 content_tool_uses, content_tool_results, is_sidechain, cwd,
+                 git_branch, input_tokens, output_tokens, cache_read_tokens,
+                 cache_creation_tokens, stop_reason, request_id, timestamp,
+                 sequence_number, todos, metadata)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
 
             # Insert subagents
-            for subagent in session.subagents:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO claude_subagents
-                    (parent_session_id, subagent_id, source_file)
-                    VALUES (?, ?, ?)
-                ''', (
-                    session_db_id,
-                    subagent['subagent_id'],
-                    subagent['source_file']
-                ))
-
-            self.conn.commit()
+            cursor.executemany('''
+                INSERT OR IGNORE INTO claude_subagents
+                (parent_session_id, subagent_id, source_file)
+                VALUES (?, ?, ?)
+            ''', [
+                (session_db_id, subagent['subagent_id'], subagent['source_file'])
+                for subagent in session.subagents
+            ])
+
+            self.conn.execute("COMMIT")
             return session_db_id
 
         except sqlite3.Error as e:
             logger.error(f"Failed to ingest session {session.session_id}: {e}")
-            self.conn.rollback()
+            self.conn.execute("ROLLBACK")
             return None
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
 
     def close(self):
         """Close database connection."""
@@ -607,10 +811,10 @@ def main():
     history_count = ingester.ingest_history(claude_parser.parse_history())
     print(f"  Ingested {history_count} history entries")
 
-    # Ingest sessions
+    # Ingest sessions; parsing runs ahead on its own thread meanwhile
     print("Ingesting sessions...")
     session_count = 0
-    for session in claude_parser.parse_sessions():
+    for session in iter_in_thread(claude_parser.parse_sessions()):
         result = ingester.ingest_session(session)
         if result:
             session_count += 1
@@ -10,14 +10,37 @@ Designed for ingestion into the datalake database.
 """
 
 import json
+import mmap
 import os
 import sqlite3
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Iterator, Optional
+from typing import Iterable, Iterator, Optional
 import logging
 import argparse
+import functools
+from itertools import islice
+
+# ingest-memory.sh runs this with the system python3, which may not have the
+# project's dependencies installed
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# WAL also lets the API keep reading while the ingester writes
+INGEST_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # Safe with WAL; skips fsync on every commit
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",  # 64 MiB
+    "PRAGMA mmap_size=268435456",  # 256 MiB
+    "PRAGMA busy_timeout=5000",
+)
+
+# Rows per executemany; a failing batch is retried one row at a time
+INSERT_BATCH_SIZE = 1000
 
 # Configure logging
 logging.basicConfig(
@@ -28,7 +51,45 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+def iter_lines(path: Path) -> Iterator[bytes]:
+    """Yield a file's lines as bytes, read through a read-only mmap.
+
+    mmap.readline splits in C straight from the page cache, with no text
+    decode and no per-chunk read buffer.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return  # mmap refuses zero-length files
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, 'madvise'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            yield from iter(mm.readline, b'')
+
+
+@functools.lru_cache(maxsize=4096)
+def unix_to_iso(timestamp_unix: float) -> str:
+    """Convert a unix timestamp to a local ISO-8601 string.
+
+    The monitor samples every process at the same instant, so consecutive
+    lines mostly share a timestamp and the cache turns the datetime round
+    trip into a dict hit.
+    """
+    return datetime.fromtimestamp(timestamp_unix).isoformat()
+
+
+def count_lines(path: Path) -> int:
+    """Count a file's lines, including a last one without a newline."""
+    lines = 0
+    last = b'\n'
+    with open(path, 'rb') as f:
+        # bytes.count scans in C; no per-line objects are created
+        while chunk := f.read(1 << 20):
+            lines += chunk.count(b'\n')
+            last = chunk[-1:]
+    return lines + (last != b'\n')
+
+
+@dataclass(slots=True)
 class MemoryMetric:
     """Represents a single memory metric entry."""
     pid: int
@@ -42,7 +103,7 @@ class MemoryMetric:
     source_device: str
 
 
-@dataclass
+@dataclass(slots=True)
 class MemoryEvent:
     """Represents a memory event entry."""
     event_type: str
@@ -66,43 +127,47 @@ class MemoryParser:
         self.metrics_file = self.log_dir / "metrics.jsonl"
         self.events_file = self.log_dir / "events.jsonl"
 
-    def parse_metrics(self, since_unix: int = 0) -> Iterator[MemoryMetric]:
-        """Parse metrics.jsonl file, optionally filtering by timestamp."""
+    def iter_metric_rows(self, since_unix: int = 0) -> Iterator[tuple]:
+        """Yield metrics newer than since_unix as memory_metrics INSERT tuples.
+
+        Skips building a MemoryMetric per line; the tuple order matches both
+        the INSERT column list and the MemoryMetric fields.
+        """
         if not self.metrics_file.exists():
             logger.warning(f"Metrics file not found: {self.metrics_file}")
             return
 
         logger.info(f"Parsing metrics from: {self.metrics_file}")
+        source_device = self.source_device
 
-        with open(self.metrics_file, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                try:
-                    data = json.loads(line.strip())
-
-                    timestamp_unix = data.get('timestamp', 0)
-                    if timestamp_unix <= since_unix:
-                        continue
-
-                    # Convert unix timestamp to ISO format
-                    timestamp_iso = datetime.fromtimestamp(
-                        timestamp_unix
-                    ).isoformat()
-
-                    yield MemoryMetric(
-                        pid=data.get('pid', 0),
-                        session_id=data.get('session_id'),
-                        rss_bytes=data.get('rss_bytes', 0),
-                        rss_mb=data.get('rss_mb', 0.0),
-                        memory_rate_mb_min=data.get('rate_mb_min'),
-                        command=data.get('command'),
-                        timestamp=timestamp_iso,
-                        timestamp_unix=timestamp_unix,
-                        source_device=self.source_device
-                    )
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Failed to parse metrics line {line_num}: {e}")
-                except Exception as e:
-                    logger.error(f"Error processing metrics line {line_num}: {e}")
+        for line_num, line in enumerate(iter_lines(self.metrics_file), 1):
+            try:
+                data = json_loads(line)
+
+                timestamp_unix = data.get('timestamp', 0)
+                if timestamp_unix <= since_unix:
+                    continue
+
+                yield (
+                    data.get('pid', 0),
+                    data.get('session_id'),
+                    data.get('rss_bytes', 0),
+                    data.get('rss_mb', 0.0),
+                    data.get('rate_mb_min'),
+                    data.get('command'),
+                    unix_to_iso(timestamp_unix),
+                    timestamp_unix,
+                    source_device
+                )
+            except json.JSONDecodeError as e:
+                logger.warning(f"Failed to parse metrics line {line_num}: {e}")
+            except Exception as e:
+                logger.error(f"Error processing metrics line {line_num}: {e}")
+
+    def parse_metrics(self, since_unix: int = 0) -> Iterator[MemoryMetric]:
+        """Parse metrics.jsonl file, optionally filtering by timestamp."""
+        for row in self.iter_metric_rows(since_unix):
+            yield MemoryMetric(*row)
 
     def parse_events(self, since_unix: int = 0) -> Iterator[MemoryEvent]:
         """Parse events.jsonl file, optionally filtering by timestamp."""
@@ -112,39 +177,36 @@ class MemoryParser:
 
         logger.info(f"Parsing events from: {self.events_file}")
 
-        with open(self.events_file, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                try:
-                    data = json.loads(line.strip())
-
-                    timestamp_unix = data.get('timestamp', 0)
-                    if timestamp_unix <= since_unix:
-                        continue
-
-                    timestamp_iso = datetime.fromtimestamp(
-                        timestamp_unix
-                    ).isoformat()
-
-                    # Handle details as JSON string
-                    details = data.get('details')
-                    if details and not isinstance(details, str):
-                        details = json.dumps(details)
-
-                    yield MemoryEvent(
-                        event_type=data.get('type', 'unknown'),
-                        pid=data.get('pid'),
-                        session_id=data.get('session_id'),
-                        severity=data.get('severity', 'info'),
-                        message=data.get('message'),
-                        details=details,
-                        timestamp=timestamp_iso,
-                        timestamp_unix=timestamp_unix,
-                        source_device=self.source_device
-                    )
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Failed to parse events line {line_num}: {e}")
-                except Exception as e:
-                    logger.error(f"Error processing events line {line_num}: {e}")
+        for line_num, line in enumerate(iter_lines(self.events_file), 1):
+            try:
+                data = json_loads(line)
+
+                timestamp_unix = data.get('timestamp', 0)
+                if timestamp_unix <= since_unix:
+                    continue
+
+                timestamp_iso = unix_to_iso(timestamp_unix)
+
+                # Handle details as JSON string
+                details = data.get('details')
+                if details and not isinstance(details, str):
+                    details = json.dumps(details)
+
+                yield MemoryEvent(
+                    event_type=data.get('type', 'unknown'),
+                    pid=data.get('pid'),
+                    session_id=data.get('session_id'),
+                    severity=data.get('severity', 'info'),
+                    message=data.get('message'),
+                    details=details,
+                    timestamp=timestamp_iso,
+                    timestamp_unix=timestamp_unix,
+                    source_device=self.source_device
+                )
+            except json.JSONDecodeError as e:
+                logger.warning(f"Failed to parse events line {line_num}: {e}")
+            except Exception as e:
+                logger.error(f"Error processing events line {line_num}: {e}")
 
     def get_stats(self) -> dict:
         """Get statistics about available data."""
@@ -156,12 +218,10 @@ class MemoryParser:
         }
 
         if self.metrics_file.exists():
-            with open(self.metrics_file, 'r') as f:
-                stats['metrics_lines'] = sum(1 for _ in f)
+            stats['metrics_lines'] = count_lines(self.metrics_file)
 
         if self.events_file.exists():
-            with open(self.events_file, 'r') as f:
-                stats['events_lines'] = sum(1 for _ in f)
+            stats['events_lines'] = count_lines(self.events_file)
 
         return stats
 
@@ -171,8 +231,11 @@ class DatalakeMemoryIngester:
 
     def __init__(self, db_path: str):
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        # Autocommit mode: each ingest call manages its own transaction
+        self.conn = sqlite3.connect(db_path, isolation_level=None)
         self.conn.row_factory = sqlite3.Row
+        for pragma in INGEST_PRAGMAS:
+            self.conn.execute(pragma)
 
     def get_last_metric_timestamp(self, source_device: str) -> int:
         """Get the timestamp of the most recent metric for a device."""
@@ -196,64 +259,97 @@ class DatalakeMemoryIngester:
 
     def ingest_metrics(self, metrics: Iterator[MemoryMetric]) -> int:
         """Ingest memory metrics into the database."""
-        cursor = self.conn.cursor()
-        count = 0
-
-        for metric in metrics:
-            try:
-                cursor.execute('''
-                    INSERT INTO memory_metrics
-                    (pid, session_id, rss_bytes, rss_mb, memory_rate_mb_min,
-                     command, timestamp, timestamp_unix, source_device)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    metric.pid,
-                    metric.session_id,
-                    metric.rss_bytes,
-                    metric.rss_mb,
-                    metric.memory_rate_mb_min,
-                    metric.command,
-                    metric.timestamp,
-                    metric.timestamp_unix,
-                    metric.source_device
-                ))
-                count += 1
-            except sqlite3.Error as e:
-                logger.error(f"Failed to insert metric: {e}")
-
-        self.conn.commit()
+        return self.ingest_metric_rows(
+            (
+                metric.pid,
+                metric.session_id,
+                metric.rss_bytes,
+                metric.rss_mb,
+                metric.memory_rate_mb_min,
+                metric.command,
+                metric.timestamp,
+                metric.timestamp_unix,
+                metric.source_device
+            )
+            for metric in metrics
+        )
+
+    def ingest_metric_rows(self, rows: Iterable[tuple]) -> int:
+        """Ingest rows from MemoryParser.iter_metric_rows into the database."""
+        count = self._insert_rows('''
+            INSERT INTO memory_metrics
+            (pid, session_id, rss_bytes, rss_mb, memory_rate_mb_min,
+             command, timestamp, timestamp_unix, source_device)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows, "metric")
         logger.info(f"Ingested {count} metrics")
         return count
 
     def ingest_events(self, events: Iterator[MemoryEvent]) -> int:
         """Ingest memory events into the database."""
-        cursor = self.conn.cursor()
+        count = self._insert_rows('''
+            INSERT INTO memory_events
+            (event_type, pid, session_id, severity, message,
+             details, timestamp, timestamp_unix, source_device)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            (
+                event.event_type,
+                event.pid,
+                event.session_id,
+                event.severity,
+                event.message,
+                event.details,
+                event.timestamp,
+                event.timestamp_unix,
+                event.source_device
+            )
+            for event in events
+        ), "event")
+        logger.info(f"Ingested {count} events")
+        return count
+
+    def _insert_rows(self, sql: str, rows: Iterable[tuple], kind: str) -> int:
+        """Insert rows in one transaction and return how many were stored.
+
+        Rows go through executemany in batches of INSERT_BATCH_SIZE. A batch
+        that fails (e.g. a NOT NULL violation or a value that can't be bound)
+        is rolled back and retried row by row, so only the bad rows are
+        logged and skipped.
+        """
+        conn = self.conn
+        cursor = conn.cursor()
+        rows = iter(rows)
         count = 0
 
-        for event in events:
-            try:
-                cursor.execute('''
-                    INSERT INTO memory_events
-                    (event_type, pid, session_id, severity, message,
-                     details, timestamp, timestamp_unix, source_device)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    event.event_type,
-                    event.pid,
-                    event.session_id,
-                    event.severity,
-                    event.message,
-                    event.details,
-                    event.timestamp,
-                    event.timestamp_unix,
-                    event.source_device
-                ))
-                count += 1
-            except sqlite3.Error as e:
-                logger.error(f"Failed to insert event: {e}")
-
-        self.conn.commit()
-        logger.info(f"Ingested {count} events")
+        # total_changes also counts rows later undone by ROLLBACK TO, so
+        # only deltas around statements that stick are added up
+        conn.execute("BEGIN")
+        try:
+            while True:
+                batch = list(islice(rows, INSERT_BATCH_SIZE))
+                if not batch:
+                    break
+                conn.execute("SAVEPOINT batch")
+                changes_before = conn.total_changes
+                try:
+                    cursor.executemany(sql, batch)
+                    count += conn.total_changes - changes_before
+                except sqlite3.Error:
+                    conn.execute("ROLLBACK TO batch")
+                    for row in batch:
+                        changes_before = conn.total_changes
+                        try:
+                            cursor.execute(sql, row)
+                            count += conn.total_changes - changes_before
+                        except sqlite3.Error as e:
+                            logger.error(f"Failed to insert {kind}: {e}")
+                conn.execute("RELEASE batch")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        conn.execute("COMMIT")
         return count
 
     def close(self):
@@ -390,8 +486,8 @@ def main():
 
     # Ingest metrics
     print("Ingesting metrics...")
-    metric_count = ingester.ingest_metrics(
-        memory_parser.parse_metrics(since_unix=last_metric_ts)
+    metric_count = ingester.ingest_metric_rows(
+        memory_parser.iter_metric_rows(since_unix=last_metric_ts)
     )
     print(f"  Ingested {metric_count} new metrics")
 
@@ -11,14 +11,16 @@ Parses voice recordings and transcripts from:
 Links audio to transcripts by timestamp proximity.
 """
 
+import json
 import os
 import re
 import sqlite3
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, Iterator
+from typing import Optional, Iterable, Iterator
 import logging
 
 logging.basicConfig(
@@ -27,8 +29,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Concurrent ffprobe subprocesses while scanning audio
+PROBE_WORKERS = os.cpu_count() or 1
+
+# WAL also lets the API keep reading while the ingester writes
+INGEST_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # Safe with WAL; skips fsync on every commit
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",  # 64 MiB
+    "PRAGMA mmap_size=268435456",  # 256 MiB
+    "PRAGMA busy_timeout=5000",
+)
+
 
-@dataclass
+@dataclass(slots=True)
 class AudioFile:
     """Represents an audio recording."""
     file_path: str
@@ -43,7 +58,7 @@ class AudioFile:
     source_project: str
 
 
-@dataclass
+@dataclass(slots=True)
 class TranscriptFile:
     """Represents a transcript."""
     file_path: str
@@ -56,7 +71,7 @@ class TranscriptFile:
     source_project: str
 
 
-@dataclass
+@dataclass(slots=True)
 class VoiceSession:
     """Linked audio + transcript session."""
     audio: Optional[AudioFile]
@@ -66,6 +81,67 @@ class VoiceSession:
     created_at: datetime
 
 
+class ProbeCache:
+    """Sidecar SQLite store of ffprobe results, keyed by path, mtime and size.
+
+    Re-scans only spawn ffprobe for files that are new or changed since the
+    last run. The store is a cache: if it can't be opened, scans just probe
+    everything.
+    """
+
+    def __init__(self, path: Path):
+        self.conn = None
+        self.entries = {}
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(path, isolation_level=None)
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS audio_probe_cache (
+                    file_path TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    duration_seconds REAL,
+                    sample_rate INTEGER,
+                    channels INTEGER
+                )
+            ''')
+            for file_path, mtime_ns, size_bytes, *probe in self.conn.execute(
+                    'SELECT * FROM audio_probe_cache'):
+                self.entries[file_path] = (mtime_ns, size_bytes, tuple(probe))
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Probe cache unavailable at {path}: {e}")
+            self.close()
+
+    def get(self, file_path: str, st: os.stat_result) -> Optional[tuple]:
+        """Return the cached probe for a file, or None if it's new or changed."""
+        entry = self.entries.get(file_path)
+        if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            return entry[2]
+        return None
+
+    def put_many(self, rows: list[tuple]) -> None:
+        """Store (file_path, mtime_ns, size_bytes, duration, sample_rate, channels) rows."""
+        for file_path, mtime_ns, size_bytes, *probe in rows:
+            self.entries[file_path] = (mtime_ns, size_bytes, tuple(probe))
+        if self.conn is None or not rows:
+            return
+        try:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO audio_probe_cache VALUES (?, ?, ?, ?, ?, ?)', rows
+            )
+            self.conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to update probe cache: {e}")
+            if self.conn.in_transaction:
+                self.conn.execute("ROLLBACK")
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
 class VoiceParser:
     """Parser for voice typing data."""
 
@@ -73,8 +149,11 @@ class VoiceParser:
     AUDIO_PATTERN = re.compile(r'^(\d{8})_(\d{6})_(.+)\.(wav|mp3|flac)$')
     TRANSCRIPT_PATTERN = re.compile(r'^(\d{8})_(\d{6})_([a-f0-9-]+)\.txt$')
 
-    def __init__(self, source_device: str = "unknown"):
+    def __init__(self, source_device: str = "unknown",
+                 probe_cache_path: Optional[str] = "~/.cache/datalake/voice-probe.db"):
         self.source_device = source_device
+        self.probe_cache_path = Path(probe_cache_path).expanduser() if probe_cache_path else None
+        self._probe_cache: Optional[ProbeCache] = None
         self.audio_dirs = [
             Path.home() / "Programs" / "recordings",
             Path.home() / "Programs" / "omarchy-voice-typing" / "recordings",
@@ -84,42 +163,61 @@ class VoiceParser:
             Path.home() / "Programs" / "omarchy-voice-typing" / "transcripts",
         ]
 
+    @property
+    def probe_cache(self) -> Optional[ProbeCache]:
+        """The probe cache, opened on first use so runs that never probe skip it."""
+        if self._probe_cache is None and self.probe_cache_path is not None:
+            self._probe_cache = ProbeCache(self.probe_cache_path)
+        return self._probe_cache
+
+    def close(self):
+        """Close the probe cache if a scan opened it."""
+        if self._probe_cache is not None:
+            self._probe_cache.close()
+            self._probe_cache = None
+
     def _parse_timestamp(self, date_str: str, time_str: str) -> datetime:
         """Parse YYYYMMDD_HHMMSS to datetime."""
         return datetime.strptime(f"{date_str}_{time_str}", "%Y%m%d_%H%M%S")
 
-    def _get_audio_duration(self, filepath: Path) -> Optional[float]:
-        """Get audio duration using ffprobe."""
-        try:
-            result = subprocess.run(
-                ['ffprobe', '-v', 'quiet', '-show_entries', 'format=duration',
-                 '-of', 'default=noprint_wrappers=1:nokey=1', str(filepath)],
-                capture_output=True, text=True, timeout=5
-            )
-            if result.returncode == 0:
-                return float(result.stdout.strip())
-        except:
-            pass
-        return None
-
-    def _get_audio_metadata(self, filepath: Path) -> dict:
-        """Get audio metadata using ffprobe."""
-        metadata = {'sample_rate': None, 'channels': None}
+    def _probe(self, filepath: str) -> tuple[Optional[float], Optional[int], Optional[int]]:
+        """Get (duration, sample_rate, channels) from a single ffprobe call."""
+        duration = sample_rate = channels = None
         try:
             result = subprocess.run(
-                ['ffprobe', '-v', 'quiet', '-show_entries',
-                 'stream=sample_rate,channels', '-of', 'csv=p=0',
+                ['ffprobe', '-v', 'quiet', '-print_format', 'json',
+                 '-show_entries', 'format=duration:stream=sample_rate,channels',
                  str(filepath)],
                 capture_output=True, text=True, timeout=5
             )
             if result.returncode == 0:
-                parts = result.stdout.strip().split(',')
-                if len(parts) >= 2:
-                    metadata['sample_rate'] = int(parts[0]) if parts[0] else None
-                    metadata['channels'] = int(parts[1]) if parts[1] else None
+                info = json.loads(result.stdout)
+                try:
+                    duration = float(info['format']['duration'])
+                except (KeyError, TypeError, ValueError):
+                    pass
+                # Skip streams without a sample rate, e.g. embedded cover art
+                for stream in info.get('streams', ()):
+                    if stream.get('sample_rate'):
+                        sample_rate = int(stream['sample_rate'])
+                        channels = stream.get('channels')
+                        break
         except:
             pass
-        return metadata
+        return duration, sample_rate, channels
+
+    def _match_audio(self, audio_dir: Path) -> list[tuple[os.DirEntry, re.Match]]:
+        """List the audio files in a directory with their filename matches."""
+        # DirEntry caches the type and stat from readdir, so each file
+        # costs at most one stat call. The name is checked first since
+        # is_file() can itself need a stat where readdir gives no type.
+        matches = []
+        with os.scandir(audio_dir) as it:
+            for entry in it:
+                match = self.AUDIO_PATTERN.match(entry.name)
+                if match and entry.is_file():
+                    matches.append((entry, match))
+        return matches
 
     def scan_audio(self) -> Iterator[AudioFile]:
         """Scan all audio directories."""
@@ -130,30 +228,45 @@ class VoiceParser:
             source_project = audio_dir.parent.name if 'omarchy' in str(audio_dir) else 'recordings'
             logger.info(f"Scanning audio: {audio_dir}")
 
-            for filepath in audio_dir.iterdir():
-                if not filepath.is_file():
-                    continue
-
-                match = self.AUDIO_PATTERN.match(filepath.name)
-                if not match:
-                    continue
-
+            matches = self._match_audio(audio_dir)
+
+            # Only new or changed files need ffprobe, which is a subprocess
+            # per file, so run those side by side
+            probe_cache = self.probe_cache if matches else None
+            probes = [
+                probe_cache.get(entry.path, entry.stat()) if probe_cache else None
+                for entry, _ in matches
+            ]
+            misses = [i for i, probe in enumerate(probes) if probe is None]
+            fresh = []
+            with ThreadPoolExecutor(max_workers=PROBE_WORKERS) as executor:
+                for i, probe in zip(misses, executor.map(
+                        self._probe, [matches[i][0].path for i in misses])):
+                    probes[i] = probe
+                    # A failed probe may be a transient ffprobe problem, so
+                    # leave it out and retry on the next run
+                    if probe != (None, None, None):
+                        entry = matches[i][0]
+                        st = entry.stat()
+                        fresh.append((entry.path, st.st_mtime_ns, st.st_size, *probe))
+
+            if probe_cache:
+                probe_cache.put_many(fresh)
+
+            for (entry, match), (duration, sample_rate, channels) in zip(matches, probes):
                 date_str, time_str, name_part, fmt = match.groups()
                 timestamp = self._parse_timestamp(date_str, time_str)
 
-                duration = self._get_audio_duration(filepath)
-                metadata = self._get_audio_metadata(filepath)
-
                 yield AudioFile(
-                    file_path=str(filepath),
-                    filename=filepath.name,
+                    file_path=entry.path,
+                    filename=entry.name,
                     original_filename=f"{name_part}.{fmt}",
                     timestamp=timestamp,
                     duration_seconds=duration,
                     format=fmt,
-                    sample_rate=metadata['sample_rate'],
-                    channels=metadata['channels'],
-                    size_bytes=filepath.stat().st_size,
+                    sample_rate=sample_rate,
+                    channels=channels,
+                    size_bytes=entry.stat().st_size,
                     source_project=source_project
                 )
 
@@ -166,40 +279,42 @@ class VoiceParser:
             source_project = transcript_dir.parent.name if 'omarchy' in str(transcript_dir) else 'transcripts'
             logger.info(f"Scanning transcripts: {transcript_dir}")
 
-            for filepath in transcript_dir.iterdir():
-                if not filepath.is_file():
-                    continue
-
-                match = self.TRANSCRIPT_PATTERN.match(filepath.name)
-                if not match:
-                    continue
-
-                date_str, time_str, session_uuid = match.groups()
-                timestamp = self._parse_timestamp(date_str, time_str)
-
-                try:
-                    content = filepath.read_text(encoding='utf-8').strip()
-                except:
-                    content = ""
-
-                word_count = len(content.split()) if content else 0
-
-                yield TranscriptFile(
-                    file_path=str(filepath),
-                    filename=filepath.name,
-                    content=content,
-                    word_count=word_count,
-                    session_uuid=session_uuid,
-                    timestamp=timestamp,
-                    size_bytes=filepath.stat().st_size,
-                    source_project=source_project
-                )
+            with os.scandir(transcript_dir) as it:
+                for entry in it:
+                    match = self.TRANSCRIPT_PATTERN.match(entry.name)
+                    if not match or not entry.is_file():
+                        continue
+
+                    date_str, time_str, session_uuid = match.groups()
+                    timestamp = self._parse_timestamp(date_str, time_str)
+
+                    try:
+                        with open(entry.path, encoding='utf-8') as f:
+                            content = f.read().strip()
+                    except:
+                        content = ""
+
+                    word_count = len(content.split()) if content else 0
+
+                    yield TranscriptFile(
+                        file_path=entry.path,
+                        filename=entry.name,
+                        content=content,
+                        word_count=word_count,
+                        session_uuid=session_uuid,
+                        timestamp=timestamp,
+                        size_bytes=entry.stat().st_size,
+                        source_project=source_project
+                    )
 
     def link_sessions(self, max_time_diff_seconds: int = 60) -> Iterator[VoiceSession]:
         """Link audio files to transcripts by timestamp proximity."""
-        # Collect all audio and transcripts
-        audio_files = list(self.scan_audio())
-        transcript_files = list(self.scan_transcripts())
+        # Collect all audio and transcripts, reading transcripts on a second
+        # thread while the audio files are being probed
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            transcripts = executor.submit(lambda: list(self.scan_transcripts()))
+            audio_files = list(self.scan_audio())
+            transcript_files = transcripts.result()
 
         logger.info(f"Found {len(audio_files)} audio, {len(transcript_files)} transcripts")
 
@@ -207,24 +322,37 @@ class VoiceParser:
         audio_files.sort(key=lambda x: x.timestamp)
         transcript_files.sort(key=lambda x: x.timestamp)
 
-        # Track used transcripts
-        used_transcripts = set()
+        # Both lists are sorted, so each audio file only needs to look at the
+        # transcripts inside its time window; `start` never moves backwards
+        max_diff = timedelta(seconds=max_time_diff_seconds)
+        used = [False] * len(transcript_files)
+        start = 0
 
         for audio in audio_files:
-            best_match = None
-            best_diff = timedelta(seconds=max_time_diff_seconds + 1)
+            window_start = audio.timestamp - max_diff
+            window_end = audio.timestamp + max_diff
+            while start < len(transcript_files) and transcript_files[start].timestamp < window_start:
+                start += 1
 
-            for transcript in transcript_files:
-                if transcript.file_path in used_transcripts:
+            best_match = None
+            best_index = None
+            best_diff = max_diff + timedelta(seconds=1)
+
+            for i in range(start, len(transcript_files)):
+                transcript = transcript_files[i]
+                if transcript.timestamp > window_end:
+                    break
+                if used[i]:
                     continue
 
                 diff = abs(transcript.timestamp - audio.timestamp)
-                if diff < best_diff and diff <= timedelta(seconds=max_time_diff_seconds):
+                if diff < best_diff:
                     best_diff = diff
                     best_match = transcript
+                    best_index = i
 
             if best_match:
-                used_transcripts.add(best_match.file_path)
+                used[best_index] = True
 
             yield VoiceSession(
                 audio=audio,
@@ -235,8 +363,8 @@ class VoiceParser:
             )
 
         # Orphan transcripts (no matching audio)
-        for transcript in transcript_files:
-            if transcript.file_path not in used_transcripts:
+        for transcript, matched in zip(transcript_files, used):
+            if not matched:
                 yield VoiceSession(
                     audio=None,
                     transcript=transcript,
@@ -247,7 +375,11 @@ class VoiceParser:
 
     def get_stats(self) -> dict:
         """Get statistics about available data."""
-        audio_count = sum(1 for _ in self.scan_audio())
+        # Counting needs no ffprobe, so this skips scan_audio's probing
+        audio_count = sum(
+            len(self._match_audio(audio_dir))
+            for audio_dir in self.audio_dirs if audio_dir.exists()
+        )
         transcript_count = sum(1 for _ in self.scan_transcripts())
         return {
             'audio_files': audio_count,
@@ -261,9 +393,30 @@ class VoiceIngester:
     def __init__(self, db_path: str):
         self.db_path = db_path
         self.conn = sqlite3.connect(db_path)
+        for pragma in INGEST_PRAGMAS:
+            self.conn.execute(pragma)
+
+    def _file_id(self, cursor: sqlite3.Cursor, table: str, file_path: str,
+                 insert_sql: str, params: tuple) -> Optional[int]:
+        """Return the id of table's row for file_path, inserting it if new.
+
+        Re-scans mostly see files that are already ingested, so looking up
+        first costs them one indexed read and no write. An upsert with
+        RETURNING would rewrite the row, and on transcripts that fires the
+        FTS update trigger.
+        """
+        select_sql = f'SELECT id FROM {table} WHERE file_path = ?'
+        row = cursor.execute(select_sql, (file_path,)).fetchone()
+        if row is None:
+            cursor.execute(insert_sql, params)
+            if cursor.rowcount > 0:
+                return cursor.lastrowid
+            # Ignored, e.g. another writer inserted it since the lookup
+            row = cursor.execute(select_sql, (file_path,)).fetchone()
+        return row[0] if row else None
 
-    def ingest_session(self, session: VoiceSession) -> Optional[int]:
-        """Ingest a voice session."""
+    def _insert_session(self, session: VoiceSession) -> Optional[int]:
+        """Insert a voice session and its files without committing."""
         cursor = self.conn.cursor()
 
         audio_id = None
@@ -271,7 +424,7 @@ class VoiceIngester:
 
         # Insert audio if present
         if session.audio:
-            cursor.execute('''
+            audio_id = self._file_id(cursor, 'audio', session.audio.file_path, '''
                 INSERT OR IGNORE INTO audio
                 (file_path, filename, original_filename, duration_seconds,
                  format, sample_rate, channels, size_bytes, source_device,
@@ -290,17 +443,10 @@ class VoiceIngester:
                 session.audio.source_project,
                 session.audio.timestamp.isoformat()
             ))
-            if cursor.rowcount > 0:
-                audio_id = cursor.lastrowid
-            else:
-                cursor.execute('SELECT id FROM audio WHERE file_path = ?',
-                             (session.audio.file_path,))
-                row = cursor.fetchone()
-                audio_id = row[0] if row else None
 
         # Insert transcript if present
         if session.transcript:
-            cursor.execute('''
+            transcript_id = self._file_id(cursor, 'transcripts', session.transcript.file_path, '''
                 INSERT OR IGNORE INTO transcripts
                 (file_path, filename, audio_id, content, word_count,
                  size_bytes, source_device, created_at)
@@ -315,13 +461,6 @@ class VoiceIngester:
                 session.source_device,
                 session.transcript.timestamp.isoformat()
             ))
-            if cursor.rowcount > 0:
-                transcript_id = cursor.lastrowid
-            else:
-                cursor.execute('SELECT id FROM transcripts WHERE file_path = ?',
-                             (session.transcript.file_path,))
-                row = cursor.fetchone()
-                transcript_id = row[0] if row else None
 
         # Insert voice session
         cursor.execute('''
@@ -337,9 +476,27 @@ class VoiceIngester:
             session.created_at.isoformat()
         ))
 
-        self.conn.commit()
         return cursor.lastrowid if cursor.rowcount > 0 else None
 
+    def ingest_session(self, session: VoiceSession) -> Optional[int]:
+        """Ingest a voice session."""
+        result = self._insert_session(session)
+        self.conn.commit()
+        return result
+
+    def ingest_sessions(self, sessions: Iterable[VoiceSession]) -> list[VoiceSession]:
+        """Ingest voice sessions in one transaction; returns the ones inserted."""
+        ingested = []
+        try:
+            for session in sessions:
+                if self._insert_session(session):
+                    ingested.append(session)
+        except Exception:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+        return ingested
+
     def close(self):
         self.conn.close()
 
@@ -352,41 +509,47 @@ def main():
     parser.add_argument('--db', '-b', default='~/Programs/datalake/datalake.db', help='Database path')
     parser.add_argument('--stats-only', '-s', action='store_true', help='Only show stats')
     parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
+    parser.add_argument('--no-probe-cache', action='store_true',
+                        help='Re-run ffprobe on every audio file')
 
     args = parser.parse_args()
 
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
 
-    voice_parser = VoiceParser(args.device)
+    if args.no_probe_cache:
+        voice_parser = VoiceParser(args.device, probe_cache_path=None)
+    else:
+        voice_parser = VoiceParser(args.device)
 
-    # Show stats
-    stats = voice_parser.get_stats()
-    print(f"\nVoice Typing Statistics for {args.device}:")
-    print(f"  Audio files: {stats['audio_files']}")
-    print(f"  Transcripts: {stats['transcripts']}")
+    try:
+        # Show stats
+        stats = voice_parser.get_stats()
+        print(f"\nVoice Typing Statistics for {args.device}:")
+        print(f"  Audio files: {stats['audio_files']}")
+        print(f"  Transcripts: {stats['transcripts']}")
 
-    if args.stats_only:
-        return
+        if args.stats_only:
+            return
 
-    # Ingest
-    db_path = os.path.expanduser(args.db)
-    print(f"\nIngesting into: {db_path}")
+        # Ingest
+        db_path = os.path.expanduser(args.db)
+        print(f"\nIngesting into: {db_path}")
 
-    ingester = VoiceIngester(db_path)
+        ingester = VoiceIngester(db_path)
 
-    session_count = 0
-    for session in voice_parser.link_sessions():
-        result = ingester.ingest_session(session)
-        if result:
-            session_count += 1
-            if args.verbose:
+        ingested = ingester.ingest_sessions(voice_parser.link_sessions())
+        if args.verbose:
+            for session in ingested:
                 audio_name = session.audio.filename if session.audio else 'no-audio'
                 transcript_words = session.transcript.word_count if session.transcript else 0
                 print(f"  {audio_name} -> {transcript_words} words")
+        session_count = len(ingested)
 
-    print(f"  Ingested {session_count} voice sessions")
-    ingester.close()
+        print(f"  Ingested {session_count} voice sessions")
+        ingester.close()
+    finally:
+        voice_parser.close()
     print("\nDone!")
 
 
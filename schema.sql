@@ -77,18 +77,108 @@ CREATE TRIGGER IF NOT EXISTS transcripts_au AFTER UPDATE ON transcripts BEGIN
     VALUES (new.id, new.content, new.filename, new.tags);
 END;
 
+-- Normalized tags: one row per (tag, record), kept in sync from the
+-- comma-separated tags column so tag filters are index seeks, not LIKE scans
+CREATE TABLE IF NOT EXISTS audio_tags (
+    tag TEXT NOT NULL,
+    audio_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL,  -- Copied from audio for (tag, created_at) range scans
+    PRIMARY KEY (tag, audio_id)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS audio_tags_ai AFTER INSERT ON audio BEGIN
+    INSERT OR IGNORE INTO audio_tags (tag, audio_id, created_at)
+    SELECT trim(value), new.id, new.created_at
+    FROM json_each('[' || replace(json_quote(new.tags), ',', '","') || ']')
+    WHERE trim(value) != '';
+END;
+
+CREATE TRIGGER IF NOT EXISTS audio_tags_ad AFTER DELETE ON audio BEGIN
+    DELETE FROM audio_tags WHERE audio_id = old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS audio_tags_au AFTER UPDATE OF tags, created_at ON audio BEGIN
+    DELETE FROM audio_tags WHERE audio_id = old.id;
+    INSERT OR IGNORE INTO audio_tags (tag, audio_id, created_at)
+    SELECT trim(value), new.id, new.created_at
+    FROM json_each('[' || replace(json_quote(new.tags), ',', '","') || ']')
+    WHERE trim(value) != '';
+END;
+
+CREATE TABLE IF NOT EXISTS transcript_tags (
+    tag TEXT NOT NULL,
+    transcript_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL,  -- Copied from transcripts for (tag, created_at) range scans
+    PRIMARY KEY (tag, transcript_id)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS transcript_tags_ai AFTER INSERT ON transcripts BEGIN
+    INSERT OR IGNORE INTO transcript_tags (tag, transcript_id, created_at)
+    SELECT trim(value), new.id, new.created_at
+    FROM json_each('[' || replace(json_quote(new.tags), ',', '","') || ']')
+    WHERE trim(value) != '';
+END;
+
+CREATE TRIGGER IF NOT EXISTS transcript_tags_ad AFTER DELETE ON transcripts BEGIN
+    DELETE FROM transcript_tags WHERE transcript_id = old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS transcript_tags_au AFTER UPDATE OF tags, created_at ON transcripts BEGIN
+    DELETE FROM transcript_tags WHERE transcript_id = old.id;
+    INSERT OR IGNORE INTO transcript_tags (tag, transcript_id, created_at)
+    SELECT trim(value), new.id, new.created_at
+    FROM json_each('[' || replace(json_quote(new.tags), ',', '","') || ']')
+    WHERE trim(value) != '';
+END;
+
+CREATE TABLE IF NOT EXISTS screenshot_tags (
+    tag TEXT NOT NULL,
+    screenshot_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL,  -- Copied from screenshots for (tag, created_at) range scans
+    PRIMARY KEY (tag, screenshot_id)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS screenshot_tags_ai AFTER INSERT ON screenshots BEGIN
+    INSERT OR IGNORE INTO screenshot_tags (tag, screenshot_id, created_at)
+    SELECT trim(value), new.id, new.created_at
+    FROM json_each('[' || replace(json_quote(new.tags), ',', '","') || ']')
+    WHERE trim(value) != '';
+END;
+
+CREATE TRIGGER IF NOT EXISTS screenshot_tags_ad AFTER DELETE ON screenshots BEGIN
+    DELETE FROM screenshot_tags WHERE screenshot_id = old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS screenshot_tags_au AFTER UPDATE OF tags, created_at ON screenshots BEGIN
+    DELETE FROM screenshot_tags WHERE screenshot_id = old.id;
+    INSERT OR IGNORE INTO screenshot_tags (tag, screenshot_id, created_at)
+    SELECT trim(value), new.id, new.created_at
+    FROM json_each('[' || replace(json_quote(new.tags), ',', '","') || ']')
+    WHERE trim(value) != '';
+END;
+
 -- Indexes for fast queries
 CREATE INDEX IF NOT EXISTS idx_audio_created_at ON audio(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_audio_created_id ON audio(created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_audio_tags ON audio(tags);
 CREATE INDEX IF NOT EXISTS idx_audio_format ON audio(format);
 
 CREATE INDEX IF NOT EXISTS idx_transcripts_created_at ON transcripts(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_transcripts_created_id ON transcripts(created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_transcripts_audio_id ON transcripts(audio_id);
 CREATE INDEX IF NOT EXISTS idx_transcripts_tags ON transcripts(tags);
 
 CREATE INDEX IF NOT EXISTS idx_screenshots_created_at ON screenshots(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_screenshots_created_id ON screenshots(created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_screenshots_tags ON screenshots(tags);
 
+CREATE INDEX IF NOT EXISTS idx_audio_tags_created_at ON audio_tags(tag, created_at DESC, audio_id DESC);
+CREATE INDEX IF NOT EXISTS idx_audio_tags_audio_id ON audio_tags(audio_id);
+CREATE INDEX IF NOT EXISTS idx_transcript_tags_created_at ON transcript_tags(tag, created_at DESC, transcript_id DESC);
+CREATE INDEX IF NOT EXISTS idx_transcript_tags_transcript_id ON transcript_tags(transcript_id);
+CREATE INDEX IF NOT EXISTS idx_screenshot_tags_created_at ON screenshot_tags(tag, created_at DESC, screenshot_id DESC);
+CREATE INDEX IF NOT EXISTS idx_screenshot_tags_screenshot_id ON screenshot_tags(screenshot_id);
+
 -- Metadata table for schema version and migration tracking
 CREATE TABLE IF NOT EXISTS metadata (
     key TEXT PRIMARY KEY,
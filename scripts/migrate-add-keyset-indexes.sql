@@ -0,0 +1,9 @@
+-- Migration: Add (created_at, id) indexes for keyset pagination
+-- Lets ORDER BY created_at DESC, id DESC and (created_at, id) < (?, ?)
+-- seeks run straight off the index with no sort step
+-- Safe to run multiple times (uses IF NOT EXISTS)
+-- Run: sqlite3 datalake.db < scripts/migrate-add-keyset-indexes.sql
+
+CREATE INDEX IF NOT EXISTS idx_audio_created_id ON audio(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_transcripts_created_id ON transcripts(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_screenshots_created_id ON screenshots(created_at DESC, id DESC);
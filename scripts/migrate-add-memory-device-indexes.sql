@@ -0,0 +1,11 @@
+-- Migration: Add (source_device, timestamp_unix) indexes to the memory tables
+-- Lets the ingester's MAX(timestamp_unix) WHERE source_device = ? lookup
+-- seek to one index entry instead of reading every row for the device
+-- Safe to run multiple times (uses IF NOT EXISTS)
+-- Run: sqlite3 datalake.db < scripts/migrate-add-memory-device-indexes.sql
+
+CREATE INDEX IF NOT EXISTS idx_memory_metrics_device_ts ON memory_metrics(source_device, timestamp_unix);
+CREATE INDEX IF NOT EXISTS idx_memory_events_device_ts ON memory_events(source_device, timestamp_unix);
+
+-- Superseded: the composite index serves source_device lookups on its own
+DROP INDEX IF EXISTS idx_memory_metrics_device;
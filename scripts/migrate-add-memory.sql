@@ -35,13 +35,14 @@ CREATE TABLE IF NOT EXISTS memory_events (
 -- Indexes for fast time-range queries
 CREATE INDEX IF NOT EXISTS idx_memory_metrics_timestamp ON memory_metrics(timestamp_unix DESC);
 CREATE INDEX IF NOT EXISTS idx_memory_metrics_pid ON memory_metrics(pid);
-CREATE INDEX IF NOT EXISTS idx_memory_metrics_device ON memory_metrics(source_device);
+CREATE INDEX IF NOT EXISTS idx_memory_metrics_device_ts ON memory_metrics(source_device, timestamp_unix);
 CREATE INDEX IF NOT EXISTS idx_memory_metrics_session ON memory_metrics(session_id);
 
 CREATE INDEX IF NOT EXISTS idx_memory_events_timestamp ON memory_events(timestamp_unix DESC);
 CREATE INDEX IF NOT EXISTS idx_memory_events_type ON memory_events(event_type);
 CREATE INDEX IF NOT EXISTS idx_memory_events_severity ON memory_events(severity);
 CREATE INDEX IF NOT EXISTS idx_memory_events_pid ON memory_events(pid);
+CREATE INDEX IF NOT EXISTS idx_memory_events_device_ts ON memory_events(source_device, timestamp_unix);
 
 -- Update schema version
 INSERT OR REPLACE INTO metadata (key, value, updated_at)
@@ -0,0 +1,109 @@
+-- Migration: Add normalized tag tables
+-- Replaces LIKE '%tag%' scans with indexed (tag, created_at) lookups
+-- Safe to run multiple times (uses IF NOT EXISTS / INSERT OR IGNORE)
+-- Run: sqlite3 datalake.db < scripts/migrate-add-tags.sql
+
+CREATE TABLE IF NOT EXISTS audio_tags (
+    tag TEXT NOT NULL,
+    audio_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL,  -- Copied from audio for (tag, created_at) range scans
+    PRIMARY KEY (tag, audio_id)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS audio_tags_ai AFTER INSERT ON audio BEGIN
+    INSERT OR IGNORE INTO audio_tags (tag, audio_id, created_at)
+    SELECT trim(value), new.id, new.created_at
+    FROM json_each('[' || replace(json_quote(new.tags), ',', '","') || ']')
+    WHERE trim(value) != '';
+END;
+
+CREATE TRIGGER IF NOT EXISTS audio_tags_ad AFTER DELETE ON audio BEGIN
+    DELETE FROM audio_tags WHERE audio_id = old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS audio_tags_au AFTER UPDATE OF tags, created_at ON audio BEGIN
+    DELETE FROM audio_tags WHERE audio_id = old.id;
+    INSERT OR IGNORE INTO audio_tags (tag, audio_id, created_at)
+    SELECT trim(value), new.id, new.created_at
+    FROM json_each('[' || replace(json_quote(new.tags), ',', '","') || ']')
+    WHERE trim(value) != '';
+END;
+
+CREATE TABLE IF NOT EXISTS transcript_tags (
+    tag TEXT NOT NULL,
+    transcript_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL,  -- Copied from transcripts for (tag, created_at) range scans
+    PRIMARY KEY (tag, transcript_id)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS transcript_tags_ai AFTER INSERT ON transcripts BEGIN
+    INSERT OR IGNORE INTO transcript_tags (tag, transcript_id, created_at)
+    SELECT trim(value), new.id, new.created_at
+    FROM json_each('[' || replace(json_quote(new.tags), ',', '","') || ']')
+    WHERE trim(value) != '';
+END;
+
+CREATE TRIGGER IF NOT EXISTS transcript_tags_ad AFTER DELETE ON transcripts BEGIN
+    DELETE FROM transcript_tags WHERE transcript_id = old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS transcript_tags_au AFTER UPDATE OF tags, created_at ON transcripts BEGIN
+    DELETE FROM transcript_tags WHERE transcript_id = old.id;
+    INSERT OR IGNORE INTO transcript_tags (tag, transcript_id, created_at)
+    SELECT trim(value), new.id, new.created_at
+    FROM json_each('[' || replace(json_quote(new.tags), ',', '","') || ']')
+    WHERE trim(value) != '';
+END;
+
+CREATE TABLE IF NOT EXISTS screenshot_tags (
+    tag TEXT NOT NULL,
+    screenshot_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL,  -- Copied from screenshots for (tag, created_at) range scans
+    PRIMARY KEY (tag, screenshot_id)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS screenshot_tags_ai AFTER INSERT ON screenshots BEGIN
+    INSERT OR IGNORE INTO screenshot_tags (tag, screenshot_id, created_at)
+    SELECT trim(value), new.id, new.created_at
+    FROM json_each('[' || replace(json_quote(new.tags), ',', '","') || ']')
+    WHERE trim(value) != '';
+END;
+
+CREATE TRIGGER IF NOT EXISTS screenshot_tags_ad AFTER DELETE ON screenshots BEGIN
+    DELETE FROM screenshot_tags WHERE screenshot_id = old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS screenshot_tags_au AFTER UPDATE OF tags, created_at ON screenshots BEGIN
+    DELETE FROM screenshot_tags WHERE screenshot_id = old.id;
+    INSERT OR IGNORE INTO screenshot_tags (tag, screenshot_id, created_at)
+    SELECT trim(value), new.id, new.created_at
+    FROM json_each('[' || replace(json_quote(new.tags), ',', '","') || ']')
+    WHERE trim(value) != '';
+END;
+
+-- Indexes for tag filters ordered by recency
+CREATE INDEX IF NOT EXISTS idx_audio_tags_created_at ON audio_tags(tag, created_at DESC, audio_id DESC);
+CREATE INDEX IF NOT EXISTS idx_audio_tags_audio_id ON audio_tags(audio_id);
+CREATE INDEX IF NOT EXISTS idx_transcript_tags_created_at ON transcript_tags(tag, created_at DESC, transcript_id DESC);
+CREATE INDEX IF NOT EXISTS idx_transcript_tags_transcript_id ON transcript_tags(transcript_id);
+CREATE INDEX IF NOT EXISTS idx_screenshot_tags_created_at ON screenshot_tags(tag, created_at DESC, screenshot_id DESC);
+CREATE INDEX IF NOT EXISTS idx_screenshot_tags_screenshot_id ON screenshot_tags(screenshot_id);
+
+-- Backfill tags for existing records
+INSERT OR IGNORE INTO audio_tags (tag, audio_id, created_at)
+SELECT trim(j.value), t.id, t.created_at
+FROM audio t, json_each('[' || replace(json_quote(t.tags), ',', '","') || ']') j
+WHERE t.tags IS NOT NULL AND trim(j.value) != '';
+
+INSERT OR IGNORE INTO transcript_tags (tag, transcript_id, created_at)
+SELECT trim(j.value), t.id, t.created_at
+FROM transcripts t, json_each('[' || replace(json_quote(t.tags), ',', '","') || ']') j
+WHERE t.tags IS NOT NULL AND trim(j.value) != '';
+
+INSERT OR IGNORE INTO screenshot_tags (tag, screenshot_id, created_at)
+SELECT trim(j.value), t.id, t.created_at
+FROM screenshots t, json_each('[' || replace(json_quote(t.tags), ',', '","') || ']') j
+WHERE t.tags IS NOT NULL AND trim(j.value) != '';
+
+INSERT OR REPLACE INTO metadata (key, value, updated_at)
+VALUES ('tags_schema_version', '1.0.0', CURRENT_TIMESTAMP);
@@ -1,18 +1,72 @@
 """Pytest configuration and fixtures for datalake tests."""
+import functools
 import os
 import shutil
 import sqlite3
-import tempfile
+import stat
+import struct
 from pathlib import Path
 import pytest
 
 
+SCHEMA_FILE = Path(__file__).parent.parent / "schema.sql"
+
+# Minimal valid WAV: 1 second of silence, 44100 Hz, 16-bit, mono
+_WAV_BYTES = struct.pack(
+    "<4sI4s4sIHHIIHH4sI",
+    b"RIFF", 36 + 44100 * 2, b"WAVE",  # ChunkID, ChunkSize, Format
+    b"fmt ", 16, 1, 1,  # Subchunk1ID, Subchunk1Size, AudioFormat (PCM), NumChannels
+    44100, 44100 * 2, 2, 16,  # SampleRate, ByteRate, BlockAlign, BitsPerSample
+    b"data", 44100 * 2,  # Subchunk2ID, Subchunk2Size
+) + bytes(44100 * 2)
+
+# Per-connection settings; journal_mode=WAL is stored in the template file
+# itself, so every copy starts in WAL mode
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",  # Safe with WAL; skips fsync on every commit
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-8000",  # 8 MB
+)
+
+
+@functools.lru_cache
+def read_schema(schema_file: Path) -> str:
+    """Read a schema file once per session."""
+    return schema_file.read_text()
+
+
+@pytest.fixture(scope="session")
+def _template_db(tmp_path_factory):
+    """Build the schema once; each test gets a copy of this database file."""
+    template = tmp_path_factory.mktemp("template") / "datalake.db"
+    conn = sqlite3.connect(template)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(read_schema(SCHEMA_FILE))
+    conn.execute("PRAGMA optimize")
+    conn.close()
+    return template
+
+
+@pytest.fixture(scope="session")
+def _schema_image():
+    """Serialized in-memory database with the schema loaded.
+
+    Built separately from _template_db: a WAL-mode image can't be
+    deserialized into a :memory: connection.
+    """
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(read_schema(SCHEMA_FILE))
+    image = conn.serialize()
+    conn.close()
+    return image
+
+
 @pytest.fixture
-def temp_datalake():
+def temp_datalake(_template_db, tmp_path_factory):
     """Create a temporary datalake environment for testing."""
-    # Create temporary directory
-    temp_dir = tempfile.mkdtemp(prefix="datalake_test_")
-    temp_path = Path(temp_dir)
+    # pytest removes old base temp directories itself
+    temp_path = tmp_path_factory.mktemp("datalake_test_")
 
     # Set up directory structure
     data_dir = temp_path / "data"
@@ -28,18 +82,12 @@ def temp_datalake():
     logs_dir.mkdir()
 
     # Copy schema file to temp directory
-    project_root = Path(__file__).parent.parent
-    schema_file = project_root / "schema.sql"
     temp_schema = temp_path / "schema.sql"
-    shutil.copy(schema_file, temp_schema)
+    shutil.copy(SCHEMA_FILE, temp_schema)
 
-    # Initialize database
+    # Initialize database from the session template
     db_file = temp_path / "datalake.db"
-    with open(temp_schema) as f:
-        schema_sql = f.read()
-    conn = sqlite3.connect(db_file)
-    conn.executescript(schema_sql)
-    conn.close()
+    shutil.copyfile(_template_db, db_file)
 
     # Return environment info
     env = {
@@ -51,35 +99,22 @@ def temp_datalake():
         "schema": temp_schema,
     }
 
-    yield env
+    return env
+
 
-    # Cleanup
-    shutil.rmtree(temp_dir, ignore_errors=True)
+@pytest.fixture(scope="session")
+def mode_bits():
+    """Provide a helper returning a path's permission bits from one stat call."""
+    def mode_bits(path) -> int:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    return mode_bits
 
 
 @pytest.fixture
 def sample_audio_file(tmp_path):
     """Create a sample audio file for testing."""
     audio_file = tmp_path / "test_audio.wav"
-    # Create a minimal valid WAV file (44 bytes header + silent audio)
-    with open(audio_file, "wb") as f:
-        # WAV header for 1 second of silence, 44100 Hz, 16-bit, mono
-        f.write(b'RIFF')  # ChunkID
-        f.write((36 + 44100 * 2).to_bytes(4, 'little'))  # ChunkSize
-        f.write(b'WAVE')  # Format
-        f.write(b'fmt ')  # Subchunk1ID
-        f.write((16).to_bytes(4, 'little'))  # Subchunk1Size
-        f.write((1).to_bytes(2, 'little'))  # AudioFormat (PCM)
-        f.write((1).to_bytes(2, 'little'))  # NumChannels (mono)
-        f.write((44100).to_bytes(4, 'little'))  # SampleRate
-        f.write((44100 * 2).to_bytes(4, 'little'))  # ByteRate
-        f.write((2).to_bytes(2, 'little'))  # BlockAlign
-        f.write((16).to_bytes(2, 'little'))  # BitsPerSample
-        f.write(b'data')  # Subchunk2ID
-        f.write((44100 * 2).to_bytes(4, 'little'))  # Subchunk2Size
-        # Write 1 second of silence
-        f.write(b'\x00' * (44100 * 2))
-
+    audio_file.write_bytes(_WAV_BYTES)
     return audio_file
 
 
@@ -88,5 +123,33 @@ def db_connection(temp_datalake):
     """Provide a database connection for testing."""
     conn = sqlite3.connect(temp_datalake["db"])
     conn.row_factory = sqlite3.Row
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def readonly_db(temp_datalake):
+    """Provide a read-only connection for checking what a script wrote."""
+    conn = sqlite3.connect(f"file:{temp_datalake['db']}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def mem_db_connection(_schema_image):
+    """Provide a connection to a private in-memory copy of the schema.
+
+    For tests that only exercise SQL; nothing touches the disk. Runs in
+    autocommit mode, so tests group writes with explicit BEGIN/COMMIT.
+    """
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    conn.deserialize(_schema_image)
+    conn.row_factory = sqlite3.Row
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    conn.execute("PRAGMA foreign_keys=ON")
     yield conn
     conn.close()
@@ -8,9 +8,9 @@ def test_database_exists(temp_datalake):
     assert temp_datalake["db"].exists()
 
 
-def test_schema_tables_exist(db_connection):
+def test_schema_tables_exist(mem_db_connection):
     """Test that all required tables are created."""
-    cursor = db_connection.cursor()
+    cursor = mem_db_connection.cursor()
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
     tables = {row[0] for row in cursor.fetchall()}
 
@@ -25,9 +25,9 @@ def test_schema_tables_exist(db_connection):
     assert required_tables.issubset(tables), f"Missing tables: {required_tables - tables}"
 
 
-def test_audio_table_schema(db_connection):
+def test_audio_table_schema(mem_db_connection):
     """Test audio table has correct columns."""
-    cursor = db_connection.cursor()
+    cursor = mem_db_connection.cursor()
     cursor.execute("PRAGMA table_info(audio);")
     columns = {row[1] for row in cursor.fetchall()}
 
@@ -40,9 +40,9 @@ def test_audio_table_schema(db_connection):
     assert required_columns == columns
 
 
-def test_transcripts_table_schema(db_connection):
+def test_transcripts_table_schema(mem_db_connection):
     """Test transcripts table has correct columns."""
-    cursor = db_connection.cursor()
+    cursor = mem_db_connection.cursor()
     cursor.execute("PRAGMA table_info(transcripts);")
     columns = {row[1] for row in cursor.fetchall()}
 
@@ -55,9 +55,9 @@ def test_transcripts_table_schema(db_connection):
     assert required_columns == columns
 
 
-def test_screenshots_table_schema(db_connection):
+def test_screenshots_table_schema(mem_db_connection):
     """Test screenshots table has correct columns."""
-    cursor = db_connection.cursor()
+    cursor = mem_db_connection.cursor()
     cursor.execute("PRAGMA table_info(screenshots);")
     columns = {row[1] for row in cursor.fetchall()}
 
@@ -70,9 +70,9 @@ def test_screenshots_table_schema(db_connection):
     assert required_columns == columns
 
 
-def test_indexes_exist(db_connection):
+def test_indexes_exist(mem_db_connection):
     """Test that indexes are created for performance."""
-    cursor = db_connection.cursor()
+    cursor = mem_db_connection.cursor()
     cursor.execute("SELECT name FROM sqlite_master WHERE type='index';")
     indexes = {row[0] for row in cursor.fetchall()}
 
@@ -93,16 +93,15 @@ def test_indexes_exist(db_connection):
     assert expected_indexes.issubset(actual_indexes), f"Missing indexes: {expected_indexes - actual_indexes}"
 
 
-def test_insert_audio_record(db_connection):
+def test_insert_audio_record(mem_db_connection):
     """Test inserting an audio record."""
-    cursor = db_connection.cursor()
+    cursor = mem_db_connection.cursor()
     cursor.execute("""
         INSERT INTO audio (file_path, filename, original_filename, duration_seconds,
                           format, sample_rate, channels, size_bytes, tags, created_at)
         VALUES ('audio/2026/01/10/test.wav', 'test.wav', 'original.wav', 10.5,
                 'wav', 44100, 2, 1024, 'test,sample', '2026-01-10T12:00:00')
     """)
-    db_connection.commit()
 
     cursor.execute("SELECT * FROM audio WHERE filename='test.wav'")
     row = cursor.fetchone()
@@ -117,9 +116,10 @@ def test_insert_audio_record(db_connection):
     assert row["tags"] == "test,sample"
 
 
-def test_insert_transcript_record(db_connection):
+def test_insert_transcript_record(mem_db_connection):
     """Test inserting a transcript record."""
-    cursor = db_connection.cursor()
+    cursor = mem_db_connection.cursor()
+    cursor.execute("BEGIN")
 
     # First insert audio record
     cursor.execute("""
@@ -135,7 +135,7 @@ def test_insert_transcript_record(db_connection):
         VALUES ('transcripts/2026/01/10/test.txt', 'test.txt', ?, 'Hello world test',
                 3, 'en', 0.95, 'assemblyai', 512, 'test', '2026-01-10T12:00:00')
     """, (audio_id,))
-    db_connection.commit()
+    cursor.execute("COMMIT")
 
     cursor.execute("SELECT * FROM transcripts WHERE filename='test.txt'")
     row = cursor.fetchone()
@@ -148,9 +148,9 @@ def test_insert_transcript_record(db_connection):
     assert row["confidence"] == 0.95
 
 
-def test_fts_search(db_connection):
+def test_fts_search(mem_db_connection):
     """Test full-text search on transcripts."""
-    cursor = db_connection.cursor()
+    cursor = mem_db_connection.cursor()
 
     # Insert test transcripts
     test_data = [
@@ -159,13 +159,12 @@ def test_fts_search(db_connection):
         ("transcripts/2026/01/10/test3.txt", "test3.txt", "Machine learning and artificial intelligence", "ai,ml"),
     ]
 
-    for file_path, filename, content, tags in test_data:
-        cursor.execute("""
-            INSERT INTO transcripts (file_path, filename, content, tags, created_at)
-            VALUES (?, ?, ?, ?, '2026-01-10T12:00:00')
-        """, (file_path, filename, content, tags))
-
-    db_connection.commit()
+    cursor.execute("BEGIN")
+    cursor.executemany("""
+        INSERT INTO transcripts (file_path, filename, content, tags, created_at)
+        VALUES (?, ?, ?, ?, '2026-01-10T12:00:00')
+    """, test_data)
+    cursor.execute("COMMIT")
 
     # Search for "python"
     cursor.execute("""
@@ -192,9 +191,9 @@ def test_fts_search(db_connection):
     assert results[0]["filename"] == "test1.txt"
 
 
-def test_metadata_table(db_connection):
+def test_metadata_table(mem_db_connection):
     """Test metadata table has schema version."""
-    cursor = db_connection.cursor()
+    cursor = mem_db_connection.cursor()
     cursor.execute("SELECT value FROM metadata WHERE key='schema_version'")
     row = cursor.fetchone()
 
@@ -202,12 +201,10 @@ def test_metadata_table(db_connection):
     assert row[0] == "1.0.0"
 
 
-def test_foreign_key_constraint(db_connection):
+def test_foreign_key_constraint(mem_db_connection):
     """Test foreign key relationship between transcripts and audio."""
-    cursor = db_connection.cursor()
-
-    # Enable foreign keys
-    cursor.execute("PRAGMA foreign_keys = ON")
+    cursor = mem_db_connection.cursor()
+    cursor.execute("BEGIN")
 
     # Insert audio
     cursor.execute("""
@@ -215,14 +212,13 @@ def test_foreign_key_constraint(db_connection):
         VALUES ('audio/2026/01/10/test.wav', 'test.wav', 'test.wav', '2026-01-10T12:00:00')
     """)
     audio_id = cursor.lastrowid
-    db_connection.commit()
 
     # Insert transcript with valid audio_id
     cursor.execute("""
         INSERT INTO transcripts (file_path, filename, audio_id, content, created_at)
         VALUES ('transcripts/2026/01/10/test.txt', 'test.txt', ?, 'Test content', '2026-01-10T12:00:00')
     """, (audio_id,))
-    db_connection.commit()
+    cursor.execute("COMMIT")
 
     # Verify transcript was inserted
     cursor.execute("SELECT COUNT(*) FROM transcripts WHERE audio_id=?", (audio_id,))
@@ -230,8 +226,31 @@ def test_foreign_key_constraint(db_connection):
 
     # Delete audio - transcript's audio_id should be set to NULL due to ON DELETE SET NULL
     cursor.execute("DELETE FROM audio WHERE id=?", (audio_id,))
-    db_connection.commit()
 
     cursor.execute("SELECT audio_id FROM transcripts WHERE filename='test.txt'")
     row = cursor.fetchone()
     assert row[0] is None  # Should be NULL after audio deletion
+
+
+def test_tag_tables_sync(mem_db_connection):
+    """Test that tag tables follow inserts, updates and deletes."""
+    cursor = mem_db_connection.cursor()
+    cursor.execute("""
+        INSERT INTO audio (file_path, filename, tags, created_at)
+        VALUES ('audio/2026/01/10/test.wav', 'test.wav', 'meeting, work,,', '2026-01-10T12:00:00')
+    """)
+    audio_id = cursor.lastrowid
+
+    cursor.execute("SELECT tag, created_at FROM audio_tags WHERE audio_id=? ORDER BY tag", (audio_id,))
+    assert [tuple(row) for row in cursor.fetchall()] == [
+        ("meeting", "2026-01-10T12:00:00"),
+        ("work", "2026-01-10T12:00:00"),
+    ]
+
+    cursor.execute("UPDATE audio SET tags='personal' WHERE id=?", (audio_id,))
+    cursor.execute("SELECT tag FROM audio_tags WHERE audio_id=?", (audio_id,))
+    assert [row[0] for row in cursor.fetchall()] == ["personal"]
+
+    cursor.execute("DELETE FROM audio WHERE id=?", (audio_id,))
+    cursor.execute("SELECT COUNT(*) FROM audio_tags")
+    assert cursor.fetchone()[0] == 0
@@ -2,18 +2,20 @@
 import os
 import subprocess
 from pathlib import Path
-import sqlite3
 import pytest
 
 
+PROJECT_ROOT = Path(__file__).parent.parent
+INGEST_SCRIPT = PROJECT_ROOT / "scripts" / "ingest-audio.sh"
+
+
 def test_ingest_audio_script_exists():
     """Test that the ingest-audio.sh script exists and is executable."""
-    script_path = Path(__file__).parent.parent / "scripts" / "ingest-audio.sh"
-    assert script_path.exists()
-    assert os.access(script_path, os.X_OK)
+    assert INGEST_SCRIPT.exists()
+    assert os.access(INGEST_SCRIPT, os.X_OK)
 
 
-def test_ingest_audio_basic(temp_datalake, sample_audio_file):
+def test_ingest_audio_basic(temp_datalake, sample_audio_file, readonly_db):
     """Test basic audio ingestion."""
     # Set environment variables
     env = os.environ.copy()
@@ -24,9 +26,8 @@ def test_ingest_audio_basic(temp_datalake, sample_audio_file):
     env["LOG_DIR"] = str(temp_datalake["logs_dir"])
 
     # Run ingestion script
-    script_path = Path(__file__).parent.parent / "scripts" / "ingest-audio.sh"
     result = subprocess.run(
-        [str(script_path), str(sample_audio_file)],
+        [str(INGEST_SCRIPT), str(sample_audio_file)],
         cwd=str(temp_datalake["root"]),
         env=env,
         capture_output=True,
@@ -38,12 +39,9 @@ def test_ingest_audio_basic(temp_datalake, sample_audio_file):
     assert "Audio ingested successfully" in result.stdout
 
     # Verify database record
-    conn = sqlite3.connect(temp_datalake["db"])
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    cursor = readonly_db.cursor()
     cursor.execute("SELECT * FROM audio ORDER BY id DESC LIMIT 1")
     row = cursor.fetchone()
-    conn.close()
 
     assert row is not None
     assert row["original_filename"] == sample_audio_file.name
@@ -51,16 +49,15 @@ def test_ingest_audio_basic(temp_datalake, sample_audio_file):
     assert row["size_bytes"] > 0
 
 
-def test_ingest_audio_with_tags(temp_datalake, sample_audio_file):
+def test_ingest_audio_with_tags(temp_datalake, sample_audio_file, readonly_db):
     """Test audio ingestion with tags."""
     env = os.environ.copy()
     env["DATA_DIR"] = str(temp_datalake["data_dir"])
     env["DB_FILE"] = str(temp_datalake["db"])
     env["LOG_DIR"] = str(temp_datalake["logs_dir"])
 
-    script_path = Path(__file__).parent.parent / "scripts" / "ingest-audio.sh"
     result = subprocess.run(
-        [str(script_path), str(sample_audio_file), "test,important,meeting"],
+        [str(INGEST_SCRIPT), str(sample_audio_file), "test,important,meeting"],
         cwd=str(temp_datalake["root"]),
         env=env,
         capture_output=True,
@@ -70,11 +67,9 @@ def test_ingest_audio_with_tags(temp_datalake, sample_audio_file):
     assert result.returncode == 0
 
     # Verify tags in database
-    conn = sqlite3.connect(temp_datalake["db"])
-    cursor = conn.cursor()
+    cursor = readonly_db.cursor()
     cursor.execute("SELECT tags FROM audio ORDER BY id DESC LIMIT 1")
     row = cursor.fetchone()
-    conn.close()
 
     assert row is not None
     assert row[0] == "test,important,meeting"
@@ -87,9 +82,8 @@ def test_ingest_audio_file_not_found(temp_datalake):
     env["DB_FILE"] = str(temp_datalake["db"])
     env["LOG_DIR"] = str(temp_datalake["logs_dir"])
 
-    script_path = Path(__file__).parent.parent / "scripts" / "ingest-audio.sh"
     result = subprocess.run(
-        [str(script_path), "nonexistent.wav"],
+        [str(INGEST_SCRIPT), "nonexistent.wav"],
         cwd=str(temp_datalake["root"]),
         env=env,
         capture_output=True,
@@ -110,9 +104,8 @@ def test_ingest_audio_no_database(temp_datalake, sample_audio_file):
     env["DB_FILE"] = str(temp_datalake["db"])
     env["LOG_DIR"] = str(temp_datalake["logs_dir"])
 
-    script_path = Path(__file__).parent.parent / "scripts" / "ingest-audio.sh"
     result = subprocess.run(
-        [str(script_path), str(sample_audio_file)],
+        [str(INGEST_SCRIPT), str(sample_audio_file)],
         cwd=str(temp_datalake["root"]),
         env=env,
         capture_output=True,
@@ -132,9 +125,8 @@ def test_ingest_audio_creates_date_directories(temp_datalake, sample_audio_file)
     env["DB_FILE"] = str(temp_datalake["db"])
     env["LOG_DIR"] = str(temp_datalake["logs_dir"])
 
-    script_path = Path(__file__).parent.parent / "scripts" / "ingest-audio.sh"
     result = subprocess.run(
-        [str(script_path), str(sample_audio_file)],
+        [str(INGEST_SCRIPT), str(sample_audio_file)],
         cwd=str(temp_datalake["root"]),
         env=env,
         capture_output=True,
@@ -158,16 +150,15 @@ def test_ingest_audio_creates_date_directories(temp_datalake, sample_audio_file)
     assert len(files) > 0
 
 
-def test_ingest_audio_file_permissions(temp_datalake, sample_audio_file):
+def test_ingest_audio_file_permissions(temp_datalake, sample_audio_file, readonly_db, mode_bits):
     """Test that ingested files have correct permissions."""
     env = os.environ.copy()
     env["DATA_DIR"] = str(temp_datalake["data_dir"])
     env["DB_FILE"] = str(temp_datalake["db"])
     env["LOG_DIR"] = str(temp_datalake["logs_dir"])
 
-    script_path = Path(__file__).parent.parent / "scripts" / "ingest-audio.sh"
     result = subprocess.run(
-        [str(script_path), str(sample_audio_file)],
+        [str(INGEST_SCRIPT), str(sample_audio_file)],
         cwd=str(temp_datalake["root"]),
         env=env,
         capture_output=True,
@@ -177,54 +168,46 @@ def test_ingest_audio_file_permissions(temp_datalake, sample_audio_file):
     assert result.returncode == 0
 
     # Find the ingested file
-    conn = sqlite3.connect(temp_datalake["db"])
-    cursor = conn.cursor()
+    cursor = readonly_db.cursor()
     cursor.execute("SELECT file_path FROM audio ORDER BY id DESC LIMIT 1")
     row = cursor.fetchone()
-    conn.close()
 
     file_path = temp_datalake["data_dir"] / row[0]
-    assert file_path.exists()
 
-    # Check permissions (should be 644)
-    stat_info = file_path.stat()
-    permissions = oct(stat_info.st_mode)[-3:]
-    assert permissions == "644"
+    # Check permissions (should be 644); raises if the file is missing
+    assert mode_bits(file_path) == 0o644
 
 
-def test_ingest_multiple_audio_files(temp_datalake, sample_audio_file, tmp_path):
+def test_ingest_multiple_audio_files(temp_datalake, sample_audio_file, tmp_path, readonly_db):
     """Test ingesting multiple audio files."""
     env = os.environ.copy()
     env["DATA_DIR"] = str(temp_datalake["data_dir"])
     env["DB_FILE"] = str(temp_datalake["db"])
     env["LOG_DIR"] = str(temp_datalake["logs_dir"])
 
-    script_path = Path(__file__).parent.parent / "scripts" / "ingest-audio.sh"
-
     # Create multiple audio files
+    audio_bytes = sample_audio_file.read_bytes()
     audio_files = []
     for i in range(3):
         audio_file = tmp_path / f"test_{i}.wav"
-        audio_file.write_bytes(sample_audio_file.read_bytes())
+        audio_file.write_bytes(audio_bytes)
         audio_files.append(audio_file)
 
     # Ingest all files
     for audio_file in audio_files:
         result = subprocess.run(
-            [str(script_path), str(audio_file), f"test,batch_{audio_file.stem}"],
+            [str(INGEST_SCRIPT), str(audio_file), f"test,batch_{audio_file.stem}"],
             cwd=str(temp_datalake["root"]),
             env=env,
             capture_output=True,
             text=True
         )
-        assert result.returncode == 0
+        assert result.returncode == 0, f"Script failed: {result.stderr}"
 
     # Verify all files in database
-    conn = sqlite3.connect(temp_datalake["db"])
-    cursor = conn.cursor()
+    cursor = readonly_db.cursor()
     cursor.execute("SELECT COUNT(*) FROM audio")
     count = cursor.fetchone()[0]
-    conn.close()
 
     assert count == 3
 
@@ -236,9 +219,8 @@ def test_logging_created(temp_datalake, sample_audio_file):
     env["DB_FILE"] = str(temp_datalake["db"])
     env["LOG_DIR"] = str(temp_datalake["logs_dir"])
 
-    script_path = Path(__file__).parent.parent / "scripts" / "ingest-audio.sh"
     subprocess.run(
-        [str(script_path), str(sample_audio_file)],
+        [str(INGEST_SCRIPT), str(sample_audio_file)],
         cwd=str(temp_datalake["root"]),
         env=env,
         capture_output=True,